@@ -0,0 +1,127 @@
+"""initial schema
+
+The tables as the app first created them with Base.metadata.create_all().
+Databases created that way are brought under migrations with
+`alembic stamp 0001` followed by `alembic upgrade head`.
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-17 06:44:53.370429
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('token_blacklist',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('token', sa.String(), nullable=True),
+    sa.Column('blacklisted_on', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_token_blacklist_token'), 'token_blacklist', ['token'], unique=True)
+    op.create_table('users',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('username', sa.String(), nullable=True),
+    sa.Column('email', sa.String(), nullable=True),
+    sa.Column('hashed_password', sa.String(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('last_login', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+    op.create_index(op.f('ix_users_username'), 'users', ['username'], unique=True)
+    op.create_table('events',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('title', sa.String(), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('start_time', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('end_time', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('location', sa.String(), nullable=True),
+    sa.Column('is_recurring', sa.Boolean(), nullable=True),
+    sa.Column('recurrence_pattern', sa.JSON(), nullable=True),
+    sa.Column('owner_id', sa.UUID(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('current_version', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_events_id'), 'events', ['id'], unique=False)
+    op.create_index(op.f('ix_events_title'), 'events', ['title'], unique=False)
+    op.create_table('event_changelogs',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('event_id', sa.UUID(), nullable=True),
+    sa.Column('user_id', sa.UUID(), nullable=True),
+    sa.Column('timestamp', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('action', sa.String(), nullable=True),
+    sa.Column('version_from', sa.Integer(), nullable=True),
+    sa.Column('version_to', sa.Integer(), nullable=True),
+    sa.Column('changes', sa.JSON(), nullable=True),
+    sa.ForeignKeyConstraint(['event_id'], ['events.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_event_changelogs_event_id'), 'event_changelogs', ['event_id'], unique=False)
+    op.create_index(op.f('ix_event_changelogs_timestamp'), 'event_changelogs', ['timestamp'], unique=False)
+    op.create_table('event_permissions',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('event_id', sa.UUID(), nullable=True),
+    sa.Column('user_id', sa.UUID(), nullable=True),
+    sa.Column('role', sa.String(), nullable=True),
+    sa.Column('granted_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('granted_by_id', sa.UUID(), nullable=True),
+    sa.ForeignKeyConstraint(['event_id'], ['events.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['granted_by_id'], ['users.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('event_id', 'user_id', name='event_user_uc')
+    )
+    op.create_index(op.f('ix_event_permissions_event_id'), 'event_permissions', ['event_id'], unique=False)
+    op.create_index(op.f('ix_event_permissions_user_id'), 'event_permissions', ['user_id'], unique=False)
+    op.create_table('event_versions',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('event_id', sa.UUID(), nullable=True),
+    sa.Column('version_number', sa.Integer(), nullable=True),
+    sa.Column('data', sa.JSON(), nullable=True),
+    sa.Column('created_by_id', sa.UUID(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('change_description', sa.String(), nullable=True),
+    sa.ForeignKeyConstraint(['created_by_id'], ['users.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['event_id'], ['events.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_event_versions_event_id'), 'event_versions', ['event_id'], unique=False)
+    op.create_index(op.f('ix_event_versions_version_number'), 'event_versions', ['version_number'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_event_versions_version_number'), table_name='event_versions')
+    op.drop_index(op.f('ix_event_versions_event_id'), table_name='event_versions')
+    op.drop_table('event_versions')
+    op.drop_index(op.f('ix_event_permissions_user_id'), table_name='event_permissions')
+    op.drop_index(op.f('ix_event_permissions_event_id'), table_name='event_permissions')
+    op.drop_table('event_permissions')
+    op.drop_index(op.f('ix_event_changelogs_timestamp'), table_name='event_changelogs')
+    op.drop_index(op.f('ix_event_changelogs_event_id'), table_name='event_changelogs')
+    op.drop_table('event_changelogs')
+    op.drop_index(op.f('ix_events_title'), table_name='events')
+    op.drop_index(op.f('ix_events_id'), table_name='events')
+    op.drop_table('events')
+    op.drop_index(op.f('ix_users_username'), table_name='users')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+    op.drop_index(op.f('ix_users_email'), table_name='users')
+    op.drop_table('users')
+    op.drop_index(op.f('ix_token_blacklist_token'), table_name='token_blacklist')
+    op.drop_table('token_blacklist')
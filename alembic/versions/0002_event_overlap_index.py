@@ -0,0 +1,26 @@
+"""index events for overlap checks
+
+Conflict checks look up an owner's events by start and end time.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 06:45:00.718148
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_events_owner_start_end', 'events', ['owner_id', 'start_time', 'end_time'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_events_owner_start_end', table_name='events')
@@ -0,0 +1,43 @@
+"""materialized event occurrences
+
+Occurrences of recurring events up to their horizon, and the horizon
+itself on each event. Recurring events start with occurrences_until NULL
+and are expanded on read until rewritten.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 06:45:07.808879
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('events', sa.Column('occurrences_until', sa.DateTime(timezone=True), nullable=True))
+    op.create_table('event_occurrences',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('event_id', sa.UUID(), nullable=True),
+    sa.Column('owner_id', sa.UUID(), nullable=True),
+    sa.Column('start_time', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('end_time', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['event_id'], ['events.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_event_occurrences_event_id'), 'event_occurrences', ['event_id'], unique=False)
+    op.create_index('ix_event_occurrences_owner_start_end', 'event_occurrences', ['owner_id', 'start_time', 'end_time'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_event_occurrences_owner_start_end', table_name='event_occurrences')
+    op.drop_index(op.f('ix_event_occurrences_event_id'), table_name='event_occurrences')
+    op.drop_table('event_occurrences')
+    op.drop_column('events', 'occurrences_until')
@@ -0,0 +1,26 @@
+"""index events for keyset pagination
+
+GET /events pages through an owner's events ordered by (start_time, id).
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 06:45:14.899610
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_events_owner_start_id', 'events', ['owner_id', 'start_time', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_events_owner_start_id', table_name='events')
@@ -0,0 +1,26 @@
+"""index permissions by user
+
+Shared events are found from the user's permissions.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 06:45:21.990341
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_event_permissions_user_event', 'event_permissions', ['user_id', 'event_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_event_permissions_user_event', table_name='event_permissions')
@@ -0,0 +1,42 @@
+"""key the token blacklist by token hash
+
+Blacklisted tokens are stored as their SHA-256 (see
+ems.utils.token_blacklist.token_digest) instead of the token itself. Existing
+entries are hashed in place, so tokens revoked before the upgrade stay
+revoked.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 06:45:28.081072
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('token_blacklist', sa.Column('token_hash', sa.String(length=64), nullable=True))
+    op.execute("UPDATE token_blacklist SET token_hash = encode(sha256(convert_to(token, 'UTF8')), 'hex')")
+    op.drop_index('ix_token_blacklist_token', table_name='token_blacklist')
+    op.drop_column('token_blacklist', 'token')
+    op.create_index(op.f('ix_token_blacklist_token_hash'), 'token_blacklist', ['token_hash'], unique=True)
+    op.create_index(op.f('ix_token_blacklist_blacklisted_on'), 'token_blacklist', ['blacklisted_on'], unique=False)
+    op.create_index(op.f('ix_token_blacklist_expires_at'), 'token_blacklist', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    # Hashes can't be turned back into tokens; the blacklist starts over
+    op.drop_index(op.f('ix_token_blacklist_expires_at'), table_name='token_blacklist')
+    op.drop_index(op.f('ix_token_blacklist_blacklisted_on'), table_name='token_blacklist')
+    op.drop_index(op.f('ix_token_blacklist_token_hash'), table_name='token_blacklist')
+    op.execute("DELETE FROM token_blacklist")
+    op.drop_column('token_blacklist', 'token_hash')
+    op.add_column('token_blacklist', sa.Column('token', sa.VARCHAR(), autoincrement=False, nullable=True))
+    op.create_index('ix_token_blacklist_token', 'token_blacklist', ['token'], unique=True)
@@ -0,0 +1,34 @@
+"""keyframed version history
+
+Versions are either full snapshots (keyframes) or the fields changed
+since the previous version. Existing versions are full snapshots, i.e.
+keyframes; `python -m ems.db.compact_versions` turns the ones in between
+into deltas.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 06:45:35.171803
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Before migrations, ems.db.compact_versions added this column itself
+    op.execute(
+        "ALTER TABLE event_versions "
+        "ADD COLUMN IF NOT EXISTS is_keyframe BOOLEAN NOT NULL DEFAULT true"
+    )
+
+
+def downgrade() -> None:
+    # Deltas only make sense as keyframes again; run `compact_versions --interval 1` first
+    op.drop_column('event_versions', 'is_keyframe')
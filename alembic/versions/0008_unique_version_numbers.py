@@ -0,0 +1,50 @@
+"""unique version numbers per event
+
+Event writes are guarded by current_version, so two versions of an
+event can no longer share a number. Concurrent edits could write such
+duplicates before; the versions of each event that has any are
+renumbered in the order they were written, and its current_version is
+raised to the last of them.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 06:45:42.262534
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        UPDATE event_versions v
+        SET version_number = renumbered.version_number
+        FROM (
+            SELECT id, ROW_NUMBER() OVER (PARTITION BY event_id ORDER BY version_number, created_at, id) AS version_number
+            FROM event_versions
+            WHERE event_id IN (
+                SELECT event_id FROM event_versions
+                GROUP BY event_id, version_number
+                HAVING count(*) > 1
+            )
+        ) renumbered
+        WHERE v.id = renumbered.id AND v.version_number IS DISTINCT FROM renumbered.version_number
+    """)
+    op.execute("""
+        UPDATE events e
+        SET current_version = latest.version_number
+        FROM (SELECT event_id, max(version_number) AS version_number FROM event_versions GROUP BY event_id) latest
+        WHERE e.id = latest.event_id AND e.current_version < latest.version_number
+    """)
+    op.create_unique_constraint('uq_event_versions_event_version', 'event_versions', ['event_id', 'version_number'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_event_versions_event_version', 'event_versions', type_='unique')
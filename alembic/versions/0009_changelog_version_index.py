@@ -0,0 +1,26 @@
+"""index changelogs by version
+
+Diffs are composed from the changelog entries between two versions.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17 06:45:49.353265
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0009'
+down_revision: Union[str, None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_event_changelogs_event_version_to', 'event_changelogs', ['event_id', 'version_to'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_event_changelogs_event_version_to', table_name='event_changelogs')
@@ -0,0 +1,26 @@
+"""index changelogs for keyset pagination
+
+The changelog is paged and streamed ordered by (timestamp, id).
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-17 06:45:56.443996
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0010'
+down_revision: Union[str, None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_event_changelogs_event_timestamp_id', 'event_changelogs', ['event_id', 'timestamp', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_event_changelogs_event_timestamp_id', table_name='event_changelogs')
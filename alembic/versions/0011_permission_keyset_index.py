@@ -0,0 +1,26 @@
+"""index permissions for keyset pagination
+
+An event's permissions are paged ordered by (granted_at, id).
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-17 06:46:03.534727
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0011'
+down_revision: Union[str, None] = '0010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_event_permissions_event_granted_id', 'event_permissions', ['event_id', 'granted_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_event_permissions_event_granted_id', table_name='event_permissions')
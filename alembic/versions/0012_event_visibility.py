@@ -0,0 +1,40 @@
+"""shared events visibility index
+
+One row per event a user can see without owning it, for the shared
+feed. It starts empty; on a database that already has shared events,
+fill it with `python -m ems.db.rebuild_visibility` after upgrading.
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-17 06:46:10.625458
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0012'
+down_revision: Union[str, None] = '0011'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Before migrations, ems.db.rebuild_visibility created this table itself
+    op.create_table('event_visibility',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('event_id', sa.UUID(), nullable=False),
+    sa.Column('start_time', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('span_end', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['event_id'], ['events.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'event_id'),
+    if_not_exists=True
+    )
+    op.create_index('ix_event_visibility_user_start_event', 'event_visibility', ['user_id', 'start_time', 'event_id'], unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_event_visibility_user_start_event', table_name='event_visibility')
+    op.drop_table('event_visibility')
@@ -0,0 +1,36 @@
+"""unique lower-cased emails
+
+Logins match the email case-insensitively, and an address can belong to
+only one account whatever its case. Existing emails are lower-cased, as
+the app now stores them. Accounts whose emails differ only in case can't
+be merged automatically; the upgrade stops and lists them, to be renamed
+or removed first.
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-17 06:46:17.716189
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '0013'
+down_revision: Union[str, None] = '0012'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    clashes = op.get_bind().execute(sa.text(
+        "SELECT lower(email) FROM users GROUP BY lower(email) HAVING count(*) > 1"
+    )).scalars().all()
+    if clashes:
+        raise RuntimeError(f"Several accounts share each of these emails, ignoring case: {', '.join(clashes)}")
+    op.execute("UPDATE users SET email = lower(email) WHERE email <> lower(email)")
+    op.create_index('ix_users_email_lower', 'users', [sa.literal_column('lower(email)')], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_email_lower', table_name='users')
@@ -0,0 +1,116 @@
+"""
+Per-request cost of authenticating a bearer token, with and without the
+verified-token cache.
+
+    DATABASE_URI=postgresql://... python benchmarks/auth_overhead.py [--iterations 20000]
+
+Times deps.get_current_user on its own and GET /auth/me through the ASGI
+app, first with the cache emptied before every call (the token's HMAC is
+checked and its claims parsed each time) and then with it warm. Everything
+it creates is removed afterwards.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Measure the endpoints, not the per-route request budget
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, insert
+
+from main import app
+from ems.core.config import settings
+from ems.db.session import SessionLocal
+from ems.dependencies import deps
+from ems.models.user_model import User
+from ems.utils import auth
+from ems.utils.auth import create_access_token
+
+
+def seed() -> uuid.UUID:
+    user_id = uuid.uuid4()
+    db = SessionLocal()
+    try:
+        db.execute(insert(User).values(id=user_id, username=f"bench-{user_id.hex[:8]}",
+                                       email=f"bench-{user_id.hex[:8]}@example.com",
+                                       hashed_password="-", is_active=True))
+        db.commit()
+    finally:
+        db.close()
+    return user_id
+
+
+def cleanup(user_id: uuid.UUID) -> None:
+    db = SessionLocal()
+    try:
+        db.execute(delete(User).where(User.id == user_id))
+        db.commit()
+    finally:
+        db.close()
+
+
+def report(name: str, timings) -> float:
+    mean = statistics.fmean(timings)
+    print(f"{name:>28}: mean {mean:8.1f} us  p50 {statistics.median(timings):8.1f} us")
+    return mean
+
+
+async def time_dependency(token: str, iterations: int, cold: bool):
+    db = SessionLocal()
+    try:
+        await deps.get_current_user(db, token)
+        timings = []
+        for _ in range(iterations):
+            if cold:
+                auth._verified_tokens.clear()
+            start = time.perf_counter()
+            await deps.get_current_user(db, token)
+            timings.append((time.perf_counter() - start) * 1e6)
+        return timings
+    finally:
+        db.close()
+
+
+def time_requests(client, token: str, iterations: int, cold: bool):
+    headers = {"Authorization": f"Bearer {token}"}
+    timings = []
+    for _ in range(iterations):
+        if cold:
+            auth._verified_tokens.clear()
+        start = time.perf_counter()
+        response = client.get(f"{settings.API_V1_STR}/auth/me", headers=headers)
+        timings.append((time.perf_counter() - start) * 1e6)
+        assert response.status_code == 200, response.text
+    return timings
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20_000, help="calls of get_current_user per case")
+    parser.add_argument("--requests", type=int, default=2_000, help="GET /auth/me requests per case")
+    args = parser.parse_args()
+
+    user_id = seed()
+    try:
+        token = create_access_token(str(user_id))
+        client = TestClient(app)
+        client.__enter__()
+        before = report("get_current_user, verify", asyncio.run(time_dependency(token, args.iterations, True)))
+        after = report("get_current_user, cached", asyncio.run(time_dependency(token, args.iterations, False)))
+        print(f"{'saved per request':>28}: {before - after:8.1f} us ({(1 - after / before) * 100:.0f}%)")
+        time_requests(client, token, 100, False)
+        report("GET /auth/me, verify", time_requests(client, token, args.requests, True))
+        report("GET /auth/me, cached", time_requests(client, token, args.requests, False))
+    finally:
+        cleanup(user_id)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
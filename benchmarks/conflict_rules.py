@@ -0,0 +1,129 @@
+"""
+Check conflict detection against the intervals_overlap reference rules.
+
+    DATABASE_URI=postgresql://... python benchmarks/conflict_rules.py [--events 2000] [--probes 500]
+
+Generates one owner's calendar of short events at minute resolution, in
+mixed UTC offsets so that many of them touch or nest, then checks that
+sweep_overlaps and check_for_conflicts find exactly the events the
+pairwise reference does for every probe interval, and times each. Exits
+non-zero on any mismatch. Everything it creates is removed afterwards.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, insert
+
+from ems.db.session import SessionLocal
+from ems.models.event_model import Event
+from ems.models.user_model import User
+from ems.services import event_service
+from ems.utils.intervals import sweep_overlaps
+
+START = datetime(2030, 1, 7, tzinfo=timezone.utc)  # Clear of real data
+ZONES = [timezone(timedelta(hours=hours)) for hours in (-8, -5, 0, 1, 5.5, 9)]
+
+
+def generate(rng: random.Random, count: int, span_minutes: int):
+    intervals = []
+    for _ in range(count):
+        start = START + timedelta(minutes=rng.randrange(span_minutes))
+        end = start + timedelta(minutes=rng.choice((15, 30, 30, 60, 90, 240)))
+        zone = rng.choice(ZONES)
+        intervals.append((start.astimezone(zone), end.astimezone(zone)))
+    return intervals
+
+
+def seed(intervals):
+    owner_id = uuid.uuid4()
+    event_ids = [uuid.uuid4() for _ in intervals]
+    db = SessionLocal()
+    try:
+        db.execute(insert(User).values(
+            id=owner_id, username=f"bench-{owner_id.hex[:8]}", email=f"bench-{owner_id.hex[:8]}@example.com",
+            hashed_password="-", is_active=True,
+        ))
+        db.execute(insert(Event), [
+            {"id": event_id, "title": "bench", "owner_id": owner_id, "current_version": 1,
+             "start_time": start, "end_time": end}
+            for event_id, (start, end) in zip(event_ids, intervals)
+        ])
+        db.commit()
+    finally:
+        db.close()
+    return owner_id, event_ids
+
+
+def cleanup(owner_id) -> None:
+    db = SessionLocal()
+    try:
+        db.execute(delete(Event).where(Event.owner_id == owner_id))
+        db.execute(delete(User).where(User.id == owner_id))
+        db.commit()
+    finally:
+        db.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--probes", type=int, default=500)
+    parser.add_argument("--days", type=int, default=30, help="span the events are spread over")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    span_minutes = args.days * 24 * 60
+    existing = generate(rng, args.events, span_minutes)
+    probes = generate(rng, args.probes, span_minutes)
+
+    owner_id, event_ids = seed(existing)
+    try:
+        keyed = sorted(zip(event_ids, *zip(*existing)), key=lambda interval: interval[1])
+
+        start = time.perf_counter()
+        expected = [
+            {event_id for event_id, event_start, event_end in keyed
+             if event_service.intervals_overlap(probe_start, probe_end, event_start, event_end)}
+            for probe_start, probe_end in probes
+        ]
+        reference_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        swept = [set(sweep_overlaps([probe], keyed)) for probe in probes]
+        sweep_ms = (time.perf_counter() - start) * 1000
+
+        db = SessionLocal()
+        try:
+            start = time.perf_counter()
+            queried = [set(event_service.check_for_conflicts(db, probe_start, probe_end, owner_id))
+                       for probe_start, probe_end in probes]
+            query_ms = (time.perf_counter() - start) * 1000
+        finally:
+            db.close()
+
+        print(f"{args.events} events, {args.probes} probes, "
+              f"{sum(map(len, expected))} overlaps by the reference rules")
+        failed = False
+        for name, found, elapsed in (("reference", expected, reference_ms), ("sweep", swept, sweep_ms),
+                                     ("query", queried, query_ms)):
+            mismatches = [i for i, (want, got) in enumerate(zip(expected, found)) if want != got]
+            print(f"{name:>10}: {elapsed:8.1f} ms  {len(mismatches)} mismatches")
+            for i in mismatches[:5]:
+                print(f"            probe {probes[i][0].isoformat()} - {probes[i][1].isoformat()}: "
+                      f"missing {len(expected[i] - found[i])}, extra {len(found[i] - expected[i])}")
+            failed = failed or bool(mismatches)
+        return 1 if failed else 0
+    finally:
+        cleanup(owner_id)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""
+Login throughput, and how the rest of the API fares during a login storm.
+
+    DATABASE_URI=postgresql://... python benchmarks/login_throughput.py [--concurrency 64] [--seconds 10]
+
+Seeds users sharing one bcrypt hash, then keeps --concurrency logins in
+flight against the ASGI app for --seconds while a probe requests
+GET /auth/me in a loop. Reports completed logins per second, how many
+were shed with 503, and probe latency idle and under the storm.
+--workers 0 runs bcrypt in the threadpool instead of worker processes.
+Everything it creates is removed afterwards.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Measure the endpoints, not the per-route request budget
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import httpx
+from sqlalchemy import delete, insert
+
+from main import app
+from ems.core.config import settings
+from ems.db.session import SessionLocal
+from ems.models.user_model import User
+from ems.utils.auth import create_access_token, get_password_hash
+from ems.utils.password_pool import password_pool
+
+PASSWORD = "benchmark-password"
+
+
+def seed(users: int):
+    tag = uuid.uuid4().hex[:8]
+    hashed = get_password_hash(PASSWORD)
+    rows = [
+        {"id": uuid.uuid4(), "username": f"bench-{tag}-{i}", "email": f"bench-{tag}-{i}@example.com",
+         "hashed_password": hashed, "is_active": True}
+        for i in range(users)
+    ]
+    db = SessionLocal()
+    try:
+        db.execute(insert(User), rows)
+        db.commit()
+    finally:
+        db.close()
+    return rows
+
+
+def cleanup(rows) -> None:
+    db = SessionLocal()
+    try:
+        db.execute(delete(User).where(User.id.in_([row["id"] for row in rows])))
+        db.commit()
+    finally:
+        db.close()
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def describe(samples) -> str:
+    if not samples:
+        return "no samples"
+    return (f"p50 {statistics.median(samples):7.1f} ms  p99 {percentile(samples, 99):7.1f} ms  "
+            f"max {max(samples):7.1f} ms")
+
+
+async def probe(client, headers, stop: asyncio.Event, timings) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.get(f"{settings.API_V1_STR}/auth/me", headers=headers)
+        timings.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.text
+        await asyncio.sleep(0.01)
+
+
+async def login_loop(client, usernames, stop: asyncio.Event, timings, statuses) -> None:
+    i = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.post(f"{settings.API_V1_STR}/auth/login",
+                                     data={"username": usernames[i % len(usernames)], "password": PASSWORD})
+        statuses[response.status_code] += 1
+        if response.status_code == 200:
+            timings.append((time.perf_counter() - start) * 1000)
+        elif response.status_code == 503:
+            # Back off as a client honouring Retry-After would, only shorter
+            await asyncio.sleep(0.05)
+        i += 1
+
+
+async def run(args, rows) -> None:
+    usernames = [row["username"] for row in rows]
+    headers = {"Authorization": f"Bearer {create_access_token(str(rows[0]['id']))}"}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        # Warm up the workers and the connection pool
+        await client.post(f"{settings.API_V1_STR}/auth/login", data={"username": usernames[0], "password": PASSWORD})
+
+        idle, stop = [], asyncio.Event()
+        task = asyncio.create_task(probe(client, headers, stop, idle))
+        await asyncio.sleep(2)
+        stop.set()
+        await task
+
+        stormy, logins, statuses, stop = [], [], Counter(), asyncio.Event()
+        tasks = [asyncio.create_task(probe(client, headers, stop, stormy))]
+        tasks += [asyncio.create_task(login_loop(client, usernames, stop, logins, statuses))
+                  for _ in range(args.concurrency)]
+        start = time.perf_counter()
+        await asyncio.sleep(args.seconds)
+        stop.set()
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+
+    print(f"{args.concurrency} concurrent logins for {elapsed:.1f} s, "
+          f"{password_pool.workers} bcrypt workers, at most {password_pool.max_pending} pending")
+    print(f"   logins: {statuses[200] / elapsed:7.1f} /s ok, responses {dict(sorted(statuses.items()))}")
+    print(f"  latency: {describe(logins)}")
+    print(f"probe idle: {describe(idle)}")
+    print(f"probe busy: {describe(stormy)}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--workers", type=int, default=settings.PASSWORD_POOL_WORKERS)
+    parser.add_argument("--max-pending", type=int, default=settings.PASSWORD_POOL_MAX_PENDING)
+    args = parser.parse_args()
+
+    password_pool.workers = args.workers
+    password_pool.max_pending = args.max_pending
+    rows = seed(args.users)
+    try:
+        asyncio.run(run(args, rows))
+    finally:
+        password_pool.shutdown()
+        cleanup(rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
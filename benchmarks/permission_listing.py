@@ -0,0 +1,128 @@
+"""
+Latency of GET /events/{id}/permissions for an event with many collaborators.
+
+    DATABASE_URI=postgresql://... python benchmarks/permission_listing.py [--collaborators 10000]
+
+Seeds one event shared with N users, then times first pages, deep pages
+(reached by following next_cursor) and role-filtered pages through the
+ASGI app. Exits non-zero if the p99 of any case exceeds --p99-ms.
+Everything it creates is removed afterwards.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Measure the endpoints, not the per-route request budget
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, insert
+
+from main import app
+from ems.core.config import settings
+from ems.db.session import SessionLocal
+from ems.models.event_model import Event
+from ems.models.permission_model import EventPermission
+from ems.models.user_model import User
+from ems.utils.auth import create_access_token
+
+
+def seed(collaborators: int):
+    tag = uuid.uuid4().hex[:8]
+    owner_id = uuid.uuid4()
+    event_id = uuid.uuid4()
+    user_ids = [uuid.uuid4() for _ in range(collaborators)]
+    db = SessionLocal()
+    try:
+        db.execute(insert(User), [
+            {"id": user_id, "username": f"bench-{tag}-{i}", "email": f"bench-{tag}-{i}@example.com",
+             "hashed_password": "-", "is_active": True}
+            for i, user_id in enumerate([owner_id] + user_ids)
+        ])
+        start = datetime.now(timezone.utc)
+        db.execute(insert(Event).values(
+            id=event_id, title="bench", owner_id=owner_id, current_version=1,
+            start_time=start, end_time=start + timedelta(hours=1),
+        ))
+        db.execute(insert(EventPermission), [
+            {"event_id": event_id, "user_id": user_id, "role": "editor" if i % 10 == 0 else "viewer",
+             "granted_by_id": owner_id}
+            for i, user_id in enumerate(user_ids)
+        ])
+        db.commit()
+    finally:
+        db.close()
+    return owner_id, event_id, user_ids
+
+
+def cleanup(owner_id, event_id, user_ids) -> None:
+    db = SessionLocal()
+    try:
+        db.execute(delete(Event).where(Event.id == event_id))
+        db.execute(delete(User).where(User.id.in_([owner_id] + user_ids)))
+        db.commit()
+    finally:
+        db.close()
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--collaborators", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=200, help="timed requests per case")
+    parser.add_argument("--limit", type=int, default=100, help="page size")
+    parser.add_argument("--p99-ms", type=float, default=50.0, help="p99 latency target per page")
+    args = parser.parse_args()
+
+    owner_id, event_id, user_ids = seed(args.collaborators)
+    try:
+        client = TestClient(app)
+        client.__enter__()
+        headers = {"Authorization": f"Bearer {create_access_token(str(owner_id))}"}
+        url = f"{settings.API_V1_STR}/events/{event_id}/permissions"
+
+        # Collect cursors for pages spread across the whole listing
+        cursors, cursor = [], None
+        while True:
+            page = client.get(url, params={"limit": args.limit, **({"cursor": cursor} if cursor else {})},
+                              headers=headers).json()
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+            cursors.append(cursor)
+
+        cases = {
+            "first page": lambda i: {"limit": args.limit},
+            "deep page": lambda i: {"limit": args.limit, "cursor": cursors[-1 - i % max(1, len(cursors) // 2)]},
+            "role=editor": lambda i: {"limit": args.limit, "role": "editor"},
+        }
+        failed = False
+        for name, params in cases.items():
+            timings = []
+            for i in range(args.requests):
+                start = time.perf_counter()
+                response = client.get(url, params=params(i), headers=headers)
+                timings.append((time.perf_counter() - start) * 1000)
+                assert response.status_code == 200, response.text
+            p99 = percentile(timings, 99)
+            failed |= p99 > args.p99_ms
+            print(f"{name:>12}: p50 {statistics.median(timings):6.1f} ms  "
+                  f"p95 {percentile(timings, 95):6.1f} ms  p99 {p99:6.1f} ms")
+        print(f"{args.collaborators} collaborators, {len(cursors) + 1} pages of {args.limit}; "
+              f"p99 target {args.p99_ms} ms: {'FAIL' if failed else 'ok'}")
+        return 1 if failed else 0
+    finally:
+        cleanup(owner_id, event_id, user_ids)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Cost of building event list responses: the ORM and Pydantic path against Core rows and orjson.
+
+    DATABASE_URI=postgresql://... python benchmarks/serialization.py [--sizes 10,100,10000]
+
+Seeds one owner with as many events as the largest size. For each size it
+times both ways of turning a page into response bytes:
+- "orm": load Event objects, validate them as EventPage and encode with
+  the stdlib json module, as FastAPI did with the response_model;
+- "rows": select Core rows, apply the generated Event serializer and
+  encode with orjson.
+Each way is timed with the query included and without it (serialization
+only), and the two bodies are checked to be identical. Exits non-zero
+if the rows path is not faster for every size. Everything it creates is
+removed afterwards.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from sqlalchemy import delete, insert
+
+from ems.db.session import SessionLocal
+from ems.models.event_model import Event
+from ems.models.user_model import User
+from ems.schemas.event_schema import Event as EventSchema, EventPage
+from ems.services import event_service
+from ems.utils.responses import page_response
+
+START = datetime(2030, 1, 7, tzinfo=timezone.utc)
+
+
+def seed(events: int):
+    owner_id = uuid.uuid4()
+    db = SessionLocal()
+    try:
+        db.execute(insert(User).values(
+            id=owner_id, username=f"bench-{owner_id.hex[:8]}", email=f"bench-{owner_id.hex[:8]}@example.com",
+            hashed_password="-", is_active=True,
+        ))
+        db.execute(insert(Event), [
+            {"id": uuid.uuid4(), "title": f"Event {i}", "description": "Weekly sync" if i % 2 else None,
+             "location": "Room 4" if i % 3 else None, "owner_id": owner_id, "current_version": 1,
+             "start_time": START + timedelta(hours=i), "end_time": START + timedelta(hours=i, minutes=45),
+             "is_recurring": i % 10 == 0,
+             "recurrence_pattern": {"frequency": "weekly", "count": 4} if i % 10 == 0 else None}
+            for i in range(events)
+        ])
+        db.commit()
+    finally:
+        db.close()
+    return owner_id
+
+
+def cleanup(owner_id) -> None:
+    db = SessionLocal()
+    try:
+        db.execute(delete(Event).where(Event.owner_id == owner_id))
+        db.execute(delete(User).where(User.id == owner_id))
+        db.commit()
+    finally:
+        db.close()
+
+
+page_field = create_model_field(name="EventPage", type_=EventPage, mode="serialization")
+
+async def orm_body(items) -> bytes:
+    content = await serialize_response(field=page_field, response_content={"items": items, "next_cursor": None})
+    return JSONResponse(content).body
+
+async def rows_body(items) -> bytes:
+    # The routes pass the Response FastAPI injects, which has no headers of its own
+    response = Response()
+    del response.headers["content-length"]
+    return page_response(EventSchema, items, None, response).body
+
+
+async def measure(owner_id, size: int, as_rows: bool, requests: int):
+    """Timings with the query, timings without it, and the last body."""
+    encode = rows_body if as_rows else orm_body
+    total, serialize = [], []
+    for _ in range(requests):
+        db = SessionLocal()  # A fresh session per request, so nothing comes from the identity map
+        try:
+            start = time.perf_counter()
+            items = event_service.get_by_owner(db, owner_id, limit=size, as_rows=as_rows)
+            fetched = time.perf_counter()
+            body = await encode(items)
+            end = time.perf_counter()
+        finally:
+            db.close()
+        total.append((end - start) * 1000)
+        serialize.append((end - fetched) * 1000)
+    return total, serialize, body
+
+
+async def run(args) -> int:
+    sizes = [int(size) for size in args.sizes.split(",")]
+    owner_id = seed(max(sizes))
+    try:
+        failed = False
+        for size in sizes:
+            orm_total, orm_serialize, orm = await measure(owner_id, size, False, args.requests)
+            rows_total, rows_serialize, rows = await measure(owner_id, size, True, args.requests)
+            assert orm == rows, f"bodies differ for {size} items"
+            speedup = statistics.median(orm_total) / statistics.median(rows_total)
+            failed |= speedup <= 1
+            print(f"{size:>6} items: orm {statistics.median(orm_total):8.2f} ms "
+                  f"(serialize {statistics.median(orm_serialize):8.2f})  "
+                  f"rows {statistics.median(rows_total):8.2f} ms "
+                  f"(serialize {statistics.median(rows_serialize):8.2f})  {speedup:4.1f}x")
+        print(f"p50 of {args.requests} requests per case, {len(orm)} byte bodies identical: "
+              f"{'FAIL' if failed else 'ok'}")
+        return 1 if failed else 0
+    finally:
+        cleanup(owner_id)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10,100,10000", help="comma-separated page sizes")
+    parser.add_argument("--requests", type=int, default=20, help="timed requests per case")
+    return asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""
+Latency of POST /events/suggest across many participants' calendars.
+
+    DATABASE_URI=postgresql://... python benchmarks/suggest_slots.py [--participants 200] [--days 365]
+
+Seeds each participant with a busy working-day calendar for the given
+number of days, free only on the afternoons of the last week, then times slot searches over the whole span through the
+ASGI app: the first (uncached) request, warm requests served from the
+free/busy cache, and the sweep alone. Exits non-zero if the warm p99
+exceeds --p99-ms. Everything it creates is removed afterwards.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, time as dt_time, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Measure the endpoints, not the per-route request budget
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, insert
+
+from main import app
+from ems.core.config import settings
+from ems.db.session import SessionLocal
+from ems.models.event_model import Event
+from ems.models.user_model import User
+from ems.services import event_service
+from ems.utils.auth import create_access_token
+
+START = datetime(2030, 1, 7, tzinfo=timezone.utc)  # A Monday, clear of real data
+
+
+def seed(participants: int, days: int, per_day: int):
+    tag = uuid.uuid4().hex[:8]
+    user_ids = [uuid.uuid4() for _ in range(participants)]
+    rng = random.Random(0)
+    db = SessionLocal()
+    try:
+        db.execute(insert(User), [
+            {"id": user_id, "username": f"bench-{tag}-{i}", "email": f"bench-{tag}-{i}@example.com",
+             "hashed_password": "-", "is_active": True}
+            for i, user_id in enumerate(user_ids)
+        ])
+        rows = []
+        for user_id in user_ids:
+            for day in range(days):
+                if (START + timedelta(days=day)).weekday() >= 5:
+                    continue
+                # Hour-aligned meetings between 08:00 and 18:00; afternoons only free up in the
+                # last week, so the search has to sweep the whole span to find a slot
+                hours = range(16, 24, 2) if day >= days - 7 else range(16, 36, 2)
+                for slot in rng.sample(hours, min(per_day, len(hours))):
+                    start = START + timedelta(days=day, minutes=30 * slot)
+                    rows.append({"id": uuid.uuid4(), "title": "bench", "owner_id": user_id, "current_version": 1,
+                                 "start_time": start, "end_time": start + timedelta(minutes=rng.choice((30, 60)))})
+        for i in range(0, len(rows), 10_000):
+            db.execute(insert(Event), rows[i:i + 10_000])
+        db.commit()
+    finally:
+        db.close()
+    return user_ids, len(rows)
+
+
+def cleanup(user_ids) -> None:
+    db = SessionLocal()
+    try:
+        db.execute(delete(Event).where(Event.owner_id.in_(user_ids)))
+        db.execute(delete(User).where(User.id.in_(user_ids)))
+        db.commit()
+    finally:
+        db.close()
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def report(name: str, timings) -> float:
+    p99 = percentile(timings, 99)
+    print(f"{name:>10}: p50 {statistics.median(timings):7.1f} ms  "
+          f"p95 {percentile(timings, 95):7.1f} ms  p99 {p99:7.1f} ms")
+    return p99
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--participants", type=int, default=200)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--per-day", type=int, default=4, help="meetings per participant per working day")
+    parser.add_argument("--requests", type=int, default=50, help="timed warm requests")
+    parser.add_argument("--p99-ms", type=float, default=100.0, help="p99 latency target for warm requests")
+    args = parser.parse_args()
+
+    user_ids, events = seed(args.participants, args.days, args.per_day)
+    try:
+        client = TestClient(app)
+        client.__enter__()
+        headers = {"Authorization": f"Bearer {create_access_token(str(user_ids[0]))}"}
+        url = f"{settings.API_V1_STR}/events/suggest"
+        body = {
+            "user_ids": [str(user_id) for user_id in user_ids[1:]],
+            "start_time": START.isoformat(),
+            "end_time": (START + timedelta(days=args.days)).isoformat(),
+            "duration_minutes": 60,
+            "count": 10,
+            "working_hours_start": "08:00",
+            "working_hours_end": "18:00",
+        }
+
+        event_service._free_busy_cache.clear()
+        start = time.perf_counter()
+        response = client.post(url, json=body, headers=headers)
+        cold = (time.perf_counter() - start) * 1000
+        assert response.status_code == 200, response.text
+        print(f"{args.participants} participants, {events} events over {args.days} days; "
+              f"{len(response.json()['slots'])} slots found")
+        print(f"{'cold':>10}: {cold:7.1f} ms")
+
+        timings = []
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            response = client.post(url, json=body, headers=headers)
+            timings.append((time.perf_counter() - start) * 1000)
+            assert response.status_code == 200, response.text
+        p99 = report("warm", timings)
+
+        # The search on its own, with every participant's busy time cached
+        db = SessionLocal()
+        try:
+            searches = []
+            for _ in range(args.requests):
+                start = time.perf_counter()
+                event_service.suggest_slots(
+                    db, user_ids, START, START + timedelta(days=args.days), duration=timedelta(minutes=60),
+                    count=10, step=timedelta(minutes=30), day_start=dt_time(8), day_end=dt_time(18),
+                    weekdays=[0, 1, 2, 3, 4], tz=timezone.utc
+                )
+                searches.append((time.perf_counter() - start) * 1000)
+        finally:
+            db.close()
+        report("search", searches)
+
+        failed = p99 > args.p99_ms
+        print(f"warm p99 target {args.p99_ms} ms: {'FAIL' if failed else 'ok'}")
+        return 1 if failed else 0
+    finally:
+        cleanup(user_ids)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,25 +8,32 @@ from sqlalchemy.orm import Session
 from ems.dependencies import deps
 from ems.schemas.user_schema import User, UserCreate
 from ems.schemas.token_schema import Token
-from ems.services import user_service , auth_service
+from ems.services import aio
 from ems.db import session
-from slowapi import Limiter
-from ems.utils.rate_limit import limiter
+from ems.db.session import DBSession
 from ems.core.config import settings
+from ems.utils.password_pool import PasswordPoolBusy, password_pool
 
 router = APIRouter()
 
+def _busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many logins in progress, try again shortly",
+        headers={"Retry-After": "1"},
+    )
+
 @router.post("/register", response_model=User)
-def register(
+async def register(
     *,
-    db: Session = Depends(session.get_db),
+    db: DBSession = Depends(session.get_db),
     user_in: UserCreate
 ) -> Any:
     """
     Register a new user.
     """
     # Check if username already exists
-    user = user_service.get_by_username(db, username=user_in.username)
+    user = await aio.user_service.get_by_username(db, username=user_in.username)
     if user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -34,57 +41,71 @@ def register(
         )
     
     # Check if email already exists   
-    if user_service.get_by_email(db, email=user_in.email):
+    if await aio.user_service.get_by_email(db, email=user_in.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered",
         )
     
-    # Create new user
-    return user_service.create(db, obj_in=user_in)
+    # Hash off the event loop, then create the user
+    try:
+        hashed_password = await password_pool.hash(user_in.password)
+    except PasswordPoolBusy:
+        raise _busy()
+    return await aio.user_service.create(db, obj_in=user_in, hashed_password=hashed_password)
 
 @router.post("/login", response_model=Token)
-def login(
-    db: Session = Depends(session.get_db),
+async def login(
+    db: DBSession = Depends(session.get_db),
     form_data: OAuth2PasswordRequestForm = Depends()
 ) -> Any:
     """
     Get access token for user.
     """
-   
-    if not auth_service.login(db, form_data.username, form_data.password):
+    user = await aio.user_service.get_by_login(db, form_data.username)
+    # Don't hold a pooled connection while waiting for bcrypt
+    await session.release_connection(db)
+    
+    # Unknown users are checked against a dummy hash, so they take as long as a wrong password
+    try:
+        valid = await password_pool.verify(form_data.password, user.hashed_password if user else None)
+    except PasswordPoolBusy:
+        raise _busy()
+    
+    if not valid or not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    return auth_service.login(db, form_data.username, form_data.password)
+    return await aio.auth_service.issue_tokens(db, user)
 
 @router.post("/refresh", response_model=Token)
-def refresh_token(
-    db: Session = Depends(session.get_db),
+async def refresh_token(
+    db: DBSession = Depends(session.get_db),
     refresh_token: str = Body(..., embed=True)
 ) -> Any:
     """
     Refresh access token.
     """
-    if not auth_service.refresh_token(db, refresh_token):
+    tokens = await aio.auth_service.refresh_token(db, refresh_token)
+    if not tokens:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid refresh token",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    return auth_service.refresh_token(db, refresh_token)
+    return tokens
 
 @router.post("/logout", status_code=status.HTTP_200_OK)
-def logout(
-    db: Session = Depends(session.get_db),
+async def logout(
+    db: DBSession = Depends(session.get_db),
     token: str = Depends(deps.oauth2_scheme),
 ) -> Any:
     """
     Logout current user.
     """
-    success = auth_service.logout(db, token)
+    success = await aio.auth_service.logout(db, token)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -94,7 +115,7 @@ def logout(
 
 #endpoint for testing purposes
 @router.get("/me", response_model=User)
-def read_users_me(current_user: User = Depends(deps.get_current_user)):
+async def read_users_me(current_user: User = Depends(deps.get_current_user)):
     """
     Get current user.
     """
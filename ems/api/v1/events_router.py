@@ -1,15 +1,23 @@
 # app/api/v1/events.py
 import uuid
 from typing import Any, List, Optional
-from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, Query, Body, status
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from fastapi import APIRouter, Depends, HTTPException, Query, Body, Header, Response, status
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
 
+from ems.core.config import settings
 from ems.dependencies import deps
 from ems.db import session
+from ems.db.session import DBSession
 from ems.models.user_model import User
-from ems.schemas.event_schema import Event, EventCreate, EventUpdate
-from ems.services import event_service 
+from ems.schemas.event_schema import Event, EventCreate, EventUpdate, EventPage, FreeBusyRequest, FreeBusyResponse, SuggestRequest, SuggestResponse
+from ems.services import event_service, aio
+from ems.utils.helper import event_etag, parse_if_match
+from ems.utils.pagination import decode_cursor, paginate
+from ems.utils.rate_limit import cost
+from ems.utils.responses import page_response
 
 router = APIRouter()
 
@@ -21,131 +29,297 @@ class ConflictResponse(BaseModel):
     conflicts: List[uuid.UUID]  # Just store the IDs of conflicting events
 
 @router.post("/", response_model=Event, status_code=status.HTTP_201_CREATED)
-def create_event(
+async def create_event(
     *,
-    db: Session = Depends(session.get_db),
+    db: DBSession = Depends(session.get_db),
     event_in: EventCreate,
+    response: Response,
     current_user: User = Depends(deps.get_current_user)
 ) -> Any:
     """
     Create a new event.
     """
     
-    # Check for conflicting events
-    conflicts = event_service.check_for_conflicts(
-        db, 
-        event_in.start_time, 
-        event_in.end_time, 
-        str(current_user.id)
-    )
+    # Create the event unless it conflicts with an existing one
+    event, conflicts = await aio.event_service.create_if_free(db, obj_in=event_in, owner_id=current_user.id)
     
     if conflicts:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail={
                 "message": "Event conflicts with existing events",
-                "conflict_ids": [str(conflict.id) for conflict in conflicts]
+                "conflict_ids": [str(conflict_id) for conflict_id in conflicts]
             }
         )
-    # Create the event
-    return event_service.create(db, obj_in=event_in, owner_id=current_user.id)
+    response.headers["ETag"] = event_etag(event.current_version)
+    return event
  
 
-@router.get("/", response_model=List[Event])
-def read_events(
-    db: Session = Depends(session.get_db),
-    skip: int = 0,
-    limit: int = 100,
+@router.get("/", response_model=EventPage)
+async def read_events(
+    response: Response,
+    db: DBSession = Depends(session.get_db),
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     current_user: User = Depends(deps.get_current_user)
 ) -> Any:
     """
-    Retrieve events.
+    Retrieve events, ordered by start time.
+    With start_date and end_date, returns every event the user can see that
+    overlaps the window, including events shared with them.
+    Use the returned `next_cursor` as `cursor` to fetch the next page.
     """
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    
     if start_date and end_date:
-        events = event_service.get_events_in_range(db, start_date, end_date, current_user.id)
-    else:
-        events = event_service.get_by_owner(db, current_user.id, skip=skip, limit=limit)
-    return events
+        # Calendar view: owned and shared events overlapping the window
+        items, next_cursor = await aio.event_service.get_events_in_range(
+            db, start_date, end_date, current_user.id, after=after, limit=limit, as_rows=True
+        )
+        return page_response(Event, items, next_cursor, response)
+    
+    events = await aio.event_service.get_by_owner(db, current_user.id, after=after, limit=limit + 1, as_rows=True)
+    items, next_cursor = paginate(events, limit, key=lambda event: (event.start_time, event.id))
+    return page_response(Event, items, next_cursor, response)
+
+@router.get("/shared", response_model=EventPage)
+async def read_shared_events(
+    response: Response,
+    db: DBSession = Depends(session.get_db),
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    current_user: User = Depends(deps.get_current_user)
+) -> Any:
+    """
+    Retrieve events other users have shared with you, ordered by start time.
+    start_date and end_date limit the list to events overlapping that window;
+    recurring events count for as long as the series runs.
+    Use the returned `next_cursor` as `cursor` to fetch the next page.
+    """
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    items, next_cursor = await aio.event_service.get_shared_events(
+        db, current_user.id, start_date, end_date, after=after, limit=limit, as_rows=True
+    )
+    return page_response(Event, items, next_cursor, response)
+
+@router.post("/freebusy", response_model=FreeBusyResponse)
+@cost(lambda body: len(body["user_ids"]))
+async def read_free_busy(
+    *,
+    db: DBSession = Depends(session.get_db),
+    request: FreeBusyRequest,
+    current_user: User = Depends(deps.get_current_user)
+) -> Any:
+    """
+    Get when each of the given users is busy within a window, and when any
+    of them is. Only busy times are returned, never event details.
+    """
+    if len(request.user_ids) > settings.FREE_BUSY_MAX_USERS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.FREE_BUSY_MAX_USERS} users per request")
+    if request.end_time - request.start_time > timedelta(days=settings.FREE_BUSY_MAX_DAYS):
+        raise HTTPException(status_code=400, detail=f"Window can span at most {settings.FREE_BUSY_MAX_DAYS} days")
+    
+    usernames = await aio.user_service.get_usernames(db, request.user_ids)
+    for user_id in request.user_ids:
+        if user_id not in usernames:
+            raise HTTPException(status_code=404, detail=f"User {user_id} not found")
+    
+    per_user, combined = await aio.event_service.get_free_busy(
+        db, request.user_ids, request.start_time, request.end_time
+    )
+    return {
+        "start_time": request.start_time,
+        "end_time": request.end_time,
+        "users": {
+            user_id: [{"start_time": start, "end_time": end} for start, end in spans]
+            for user_id, spans in per_user.items()
+        },
+        "combined": [{"start_time": start, "end_time": end} for start, end in combined],
+    }
+
+@router.post("/suggest", response_model=SuggestResponse)
+@cost(lambda body: 1 + len(body.get("user_ids", [])))
+async def suggest_slots(
+    *,
+    db: DBSession = Depends(session.get_db),
+    request: SuggestRequest,
+    response: Response,
+    current_user: User = Depends(deps.get_current_user)
+) -> Any:
+    """
+    Find the first free slots of the given length for you and the other
+    participants, within working hours. With `create`, also create the
+    event in the first slot that is still free, checked the same way as
+    creating an event directly.
+    """
+    try:
+        tz = ZoneInfo(request.timezone)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(status_code=400, detail=f"Unknown time zone {request.timezone}")
+    
+    user_ids = list(dict.fromkeys([current_user.id, *request.user_ids]))
+    if len(user_ids) > settings.FREE_BUSY_MAX_USERS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.FREE_BUSY_MAX_USERS} users per request")
+    if request.end_time - request.start_time > timedelta(days=settings.FREE_BUSY_MAX_DAYS):
+        raise HTTPException(status_code=400, detail=f"Window can span at most {settings.FREE_BUSY_MAX_DAYS} days")
+    
+    usernames = await aio.user_service.get_usernames(db, request.user_ids)
+    for user_id in request.user_ids:
+        if user_id not in usernames:
+            raise HTTPException(status_code=404, detail=f"User {user_id} not found")
+    
+    slots = await aio.event_service.suggest_slots(
+        db, user_ids, request.start_time, request.end_time,
+        duration=timedelta(minutes=request.duration_minutes),
+        count=request.count,
+        step=timedelta(minutes=request.step_minutes),
+        day_start=request.working_hours_start,
+        day_end=request.working_hours_end,
+        weekdays=request.working_days,
+        tz=tz
+    )
+    result = {"slots": [{"start_time": start, "end_time": end} for start, end in slots]}
+    if not request.create:
+        return result
+    
+    # Another request may have taken a slot since the free/busy data was read
+    for start, end in slots:
+        event_in = EventCreate(start_time=start, end_time=end, **request.create.model_dump())
+        event, _ = await aio.event_service.create_if_free(
+            db, obj_in=event_in, owner_id=current_user.id, attendee_ids=user_ids
+        )
+        if event:
+            response.headers["ETag"] = event_etag(event.current_version)
+            return {**result, "event": event}
+    raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="No free slot left to create the event in")
 
 @router.get("/{event_id}", response_model=Event)
-def read_event(
+async def read_event(
+    response: Response,
     event: Event = Depends(deps.get_event_with_permission("view"))
 ) -> Any:
     """
-    Get event by ID.
+    Get event by ID. The ETag header identifies the version, for If-Match on update.
     """
+    response.headers["ETag"] = event_etag(event.current_version)
     return event
 
 @router.put("/{event_id}", response_model=Event)
-def update_event(
+async def update_event(
     *,
     event: Event = Depends(deps.get_event_with_permission("edit")),
     event_in: EventUpdate,
-    db: Session = Depends(session.get_db)
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: DBSession = Depends(session.get_db)
 ) -> Any:
     """
     Update an event.
+    Send the ETag from a read as If-Match to fail with 412 instead of
+    overwriting someone else's edit; without it, concurrent edits are
+    applied one after the other.
     """
-    # Check for conflicts if date/time is being updated
-    if event_in.start_time or event_in.end_time:
-        start_time = event_in.start_time or event.start_time
-        end_time = event_in.end_time or event.end_time
-        
-        conflicts = event_service.check_for_conflicts(
-            db, 
-            start_time, 
-            end_time, 
-            str(event.owner_id),
-            str(event.id)
+    # "*" matches whichever version is current, as no If-Match does
+    expected_versions = parse_if_match(if_match) if if_match is not None else None
+    
+    # The conflict check and the write share one transaction holding the owner's lock
+    try:
+        updated, conflicts = await aio.event_service.update_if_free(
+            db, db_obj=event, obj_in=event_in, expected_versions=expected_versions
         )
-        if conflicts:
+    except StaleDataError:
+        if expected_versions is not None:
             raise HTTPException(
-                status_code=409,
-                detail={
-                    "message": "Event update conflicts with existing events",
-                    "conflict_ids": [str(conflict.id) for conflict in conflicts]
-                }
+                status_code=status.HTTP_412_PRECONDITION_FAILED,
+                detail="Event has been modified since it was read"
             )
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Event is being modified concurrently, try again"
+        )
+    if conflicts:
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "message": "Event update conflicts with existing events",
+                "conflict_ids": [str(conflict_id) for conflict_id in conflicts]
+            }
+        )
     
-    event = event_service.update(db, db_obj=event, obj_in=event_in)
-    return event
+    response.headers["ETag"] = event_etag(updated.current_version)
+    return updated
 
 @router.delete("/{event_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_event(
+async def delete_event(
     *,
     event: Event = Depends(deps.get_event_with_permission("delete")),
-    db: Session = Depends(session.get_db)
+    if_match: Optional[str] = Header(None),
+    db: DBSession = Depends(session.get_db)
 ) -> None:
     """
     Delete an event.
+    Send the ETag from a read as If-Match to fail with 412 if the event has
+    been edited since; without it, an edit landing during the delete gives 409.
     """
-    event_service.delete(db, db_obj=event)
+    expected_versions = parse_if_match(if_match) if if_match is not None else None
+    
+    try:
+        await aio.event_service.delete(db, db_obj=event, expected_versions=expected_versions)
+    except StaleDataError:
+        if expected_versions is not None:
+            raise HTTPException(
+                status_code=status.HTTP_412_PRECONDITION_FAILED,
+                detail="Event has been modified since it was read"
+            )
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Event is being modified concurrently, try again"
+        )
     
 
 
 @router.post("/batch", response_model=List[Event])
-def create_batch_events(
+@cost(len)
+async def create_batch_events(
     *,
-    db: Session = Depends(session.get_db),
+    db: DBSession = Depends(session.get_db),
     events_in: List[EventCreate],
     current_user: User = Depends(deps.get_current_user)
 ) -> Any:
     """
     Create multiple events in a single request.
+    The whole batch is rejected if its events overlap each other or existing events.
     """
-    # Check for conflicts for all events
-    all_conflicts = []
-    for event_in in events_in:
-        conflicts = event_service.check_for_conflicts(
-            db, 
-            event_in.start_time, 
-            event_in.end_time, 
-            current_user.id
+    # Check the batch against itself first; this needs no database access
+    batch_overlaps = event_service.find_batch_overlaps(events_in)
+    if batch_overlaps:
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "message": "Some events in the batch overlap each other",
+                "batch_conflicts": [list(pair) for pair in batch_overlaps]
+            }
         )
-        if conflicts:
-            all_conflicts.extend(conflicts)
+    
+    # Check for conflicts for all events in one pass, holding the owner's lock through the insert
+    events, all_conflicts = await aio.event_service.create_batch_if_free(
+        db, obj_in_list=events_in, owner_id=current_user.id
+    )
     
     if all_conflicts:
         # Return HTTPException with conflict details
@@ -153,9 +327,8 @@ def create_batch_events(
             status_code=409,  # Conflict status code
             detail={
                 "message": "Some events conflict with existing events",
-                "conflict_ids": [str(conflict.id) for conflict in all_conflicts]
+                "conflict_ids": [str(conflict_id) for conflict_id in all_conflicts]
             }
         )
     
-    events = event_service.create_batch(db, obj_in_list=events_in, owner_id=current_user.id)
     return events
\ No newline at end of file
@@ -1,135 +1,146 @@
 # app/api/v1/permissions.py
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, Path
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Response
 from sqlalchemy.orm import Session
 import uuid
 
 from ems.dependencies import deps
 from ems.models.user_model import User
-from ems.schemas.permission_schema import Permission, PermissionCreate, PermissionUpdate, ShareEventRequest
-from ems.services import  event_service, permission_service, user_service
+from ems.schemas.permission_schema import Permission, PermissionCreate, PermissionPage, PermissionUpdate, ShareEventRequest, ShareEventsRequest
+from ems.services import aio, permission_service
+from ems.services.permission_service import EventAccess
 from ems.utils.helper import permission_to_dict
 from ems.db import session
+from ems.db.session import DBSession
+from ems.utils.pagination import decode_cursor
+from ems.utils.rate_limit import cost
+from ems.utils.responses import page_response
 
 
 router = APIRouter()
 
+async def _share(db: DBSession, event_ids: List[uuid.UUID], share_data: ShareEventRequest,
+                 current_user: User) -> List[Permission]:
+    # Validate every target user with one query
+    grants = {}
+    for user_id, role in share_data.grants().items():
+        try:
+            grants[uuid.UUID(user_id)] = role
+        except ValueError:
+            raise HTTPException(status_code=404, detail=f"User {user_id} not found")
+    usernames = await aio.user_service.get_usernames(db, grants)
+    for user_id in grants:
+        if user_id not in usernames:
+            raise HTTPException(status_code=404, detail=f"User {user_id} not found")
+    
+    # Create or update all permissions in one statement
+    permissions = await aio.permission_service.share_events(db, event_ids, grants, current_user.id)
+    return [
+        Permission.model_validate(permission_to_dict(permission, usernames[permission.user_id]))
+        for permission in permissions
+    ]
+
+def _share_targets(body: dict) -> int:
+    return len(ShareEventRequest.model_validate(body).grants())
+
+@router.post("/share", response_model=List[Permission])
+@cost(lambda body: len(body["event_ids"]) * _share_targets(body))
+async def share_events(
+    *,
+    db: DBSession = Depends(session.get_db),
+    share_data: ShareEventsRequest,
+    current_user: User = Depends(deps.get_current_user)
+) -> Any:
+    """
+    Share several events with the same users and groups in one call.
+    """
+    event_ids = []
+    for event_id in share_data.event_ids:
+        try:
+            event_ids.append(uuid.UUID(event_id))
+        except ValueError:
+            raise HTTPException(status_code=404, detail=f"Event {event_id} not found")
+    
+    # Check access to every event with one query
+    roles = await aio.permission_service.get_event_roles(db, event_ids, current_user.id)
+    for event_id in event_ids:
+        if event_id not in roles:
+            raise HTTPException(status_code=404, detail=f"Event {event_id} not found")
+        if 'share' not in permission_service.ROLE_CAPABILITIES.get(roles[event_id], ()):
+            raise HTTPException(status_code=403, detail=f"Not enough permissions to share event {event_id}")
+    
+    return await _share(db, list(dict.fromkeys(event_ids)), share_data, current_user)
+
 @router.post("/{event_id}/share", response_model=List[Permission])
-def share_event(
+@cost(_share_targets)
+async def share_event(
     *,
-    db: Session = Depends(session.get_db),
+    db: DBSession = Depends(session.get_db),
     event_id: str = Path(...),
     share_data: ShareEventRequest,
+    access: EventAccess = Depends(deps.get_event_access("share")),
     current_user: User = Depends(deps.get_current_user)
 ) -> Any:
     """
-    Share an event with other users.
+    Share an event with other users, individually or in groups.
     """
-    event = event_service.get_by_id(db, event_id)
-    if not event:
-        raise HTTPException(status_code=404, detail="Event not found")
-    
-    # Check if the current user is the owner or has share permission
-    if event.owner_id != current_user.id:
-        permission = permission_service.get_permission(db, event_id, current_user.id)
-        if not permission or not permission.can_share:
-            raise HTTPException(status_code=403, detail="Not enough permissions")
-    
-    results = []
-    for user_role in share_data.users:
-        permission_in = PermissionCreate(user_id=user_role.user_id, role=user_role.role)
-        # Check if the user exists
-        user = user_service.get_by_id(db, permission_in.user_id)
-        if not user:
-            raise HTTPException(status_code=404, detail=f"User {permission_in.user_id} not found")
-        
-        # Check if permission already exists
-        existing_permission = permission_service.get_permission(db, event_id, permission_in.user_id)
-        if existing_permission:
-            # Update existing permission
-            permission = permission_service.update_permission(db, existing_permission, permission_in)
-        else:
-            # Create new permission
-            permission = permission_service.create_permission(
-                db, permission_in, event_id, current_user.id
-            )
-        
-        # Add username to the result
-        permission_dict = permission_to_dict(permission, user.username)
-        results.append(Permission.model_validate(permission_dict))
-    
-    return results
+    return await _share(db, [access.event_id], share_data, current_user)
 
-@router.get("/{event_id}/permissions", response_model=List[Permission])
-def get_event_permissions(
+@router.get("/{event_id}/permissions", response_model=PermissionPage)
+async def get_event_permissions(
     *,
-    db: Session = Depends(session.get_db),
+    response: Response,
+    db: DBSession = Depends(session.get_db),
     event_id: str = Path(...),
-    current_user: User = Depends(deps.get_current_user)
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    role: Optional[str] = Query(None, pattern="^(owner|editor|viewer)$"),
+    access: EventAccess = Depends(deps.get_event_access("view"))
 ) -> Any:
     """
-    Get all permissions for an event.
+    Get the permissions for an event, in the order they were granted.
+    Use the returned `next_cursor` as `cursor` to fetch the next page.
     """
-    event = event_service.get_by_id(db, event_id)
-    if not event:
-        raise HTTPException(status_code=404, detail="Event not found")
-    
-    # Check if the current user has access to the event
-    if event.owner_id != current_user.id:
-        permission = permission_service.get_permission(db, event_id, current_user.id)
-        if not permission or not permission.can_view:
-            raise HTTPException(status_code=403, detail="Not enough permissions")
-    
-    permissions = permission_service.get_permissions_by_event(db, event_id)
-    
-    # Add username to each permission
-    result = []
-    for permission in permissions:
-        user = user_service.get_by_id(db, permission.user_id)
-        username = user.username if user else "Unknown"
-        permission_dict = permission_to_dict(permission, username)
-        result.append(Permission.model_validate(permission_dict))
-    
-    return result
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    items, next_cursor = await aio.permission_service.get_permission_page(
+        db, access.event_id, after=after, limit=limit, role=role
+    )
+    return page_response(Permission, items, next_cursor, response)
 
 @router.put("/{event_id}/permissions/{user_id}", response_model=Permission)
-def update_user_permission(
+async def update_user_permission(
     *,
-    db: Session = Depends(session.get_db),
+    db: DBSession = Depends(session.get_db),
     event_id: str = Path(...),
     user_id: str = Path(...),
     permission_in: PermissionUpdate,
-    current_user: User = Depends(deps.get_current_user)
+    access: EventAccess = Depends(deps.get_event_access("edit"))
 ) -> Any:
     """
     Update permissions for a user.
     """
-    event = event_service.get_by_id(db, event_id)
-    if not event:
-        raise HTTPException(status_code=404, detail="Event not found")
-    
-    # Check if the current user is the owner or has share permission
-    if event.owner_id != current_user.id:
-        permission = permission_service.get_permission(db, event_id, current_user.id)
-        if not permission or not permission.can_edit:
-            raise HTTPException(status_code=403, detail="Not enough permissions")
-    
     # Check if the user exists
-    user = user_service.get_by_id(db, user_id)
+    user = await aio.user_service.get_by_id(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Check if permission exists
-    permission = permission_service.get_permission(db, event_id, user_id)
+    permission = await aio.permission_service.get_permission(db, event_id, user_id)
     if not permission:
         raise HTTPException(status_code=404, detail="Permission not found")
     
     # Don't allow changing the owner's permissions
-    if event.owner_id == user_id:
+    if str(access.owner_id) == user_id:
         raise HTTPException(status_code=400, detail="Cannot change owner's permissions")
     
     # Update permission
-    updated_permission = permission_service.update_permission(db, permission, permission_in)
+    updated_permission = await aio.permission_service.update_permission(db, permission, permission_in)
     
     # Add username to the result
     permission_dict = permission_to_dict(updated_permission, user.username)
@@ -138,34 +149,24 @@ def update_user_permission(
     return result
 
 @router.delete("/{event_id}/permissions/{user_id}", status_code=204)
-def remove_user_access(
+async def remove_user_access(
     *,
-    db: Session = Depends(session.get_db),
+    db: DBSession = Depends(session.get_db),
     event_id: str = Path(...),
     user_id: str = Path(...),
-    current_user: User = Depends(deps.get_current_user)
+    access: EventAccess = Depends(deps.get_event_access("delete"))
 ) -> None:
     """
     Remove access for a user.
     """
-    event = event_service.get_by_id(db, event_id)
-    if not event:
-        raise HTTPException(status_code=404, detail="Event not found")
-    
-    # Check if the current user is the owner or has share permission
-    if event.owner_id != current_user.id:
-        permission = permission_service.get_permission(db, event_id, current_user.id)
-        if not permission or not permission.can_delete:
-            raise HTTPException(status_code=403, detail="Not enough permissions")
-    
     # Don't allow removing the owner's access
-    if event.owner_id == user_id:
+    if str(access.owner_id) == user_id:
         raise HTTPException(status_code=400, detail="Cannot remove owner's access")
     
     # Check if permission exists
-    permission = permission_service.get_permission(db, event_id, user_id)
+    permission = await aio.permission_service.get_permission(db, event_id, user_id)
     if not permission:
         raise HTTPException(status_code=404, detail="Permission not found")
     
     # Delete permission
-    permission_service.delete_permission(db, permission)
\ No newline at end of file
+    await aio.permission_service.delete_permission(db, permission)
\ No newline at end of file
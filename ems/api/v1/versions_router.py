@@ -1,169 +1,143 @@
 # app/api/v1/versions.py
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, Path, status
+from datetime import datetime
+from typing import Any, AsyncIterator, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
 
 from ems.dependencies import deps
 from ems.models.user_model import User
 from ems.schemas.event_schema import Event as EventSchema
-from ems.schemas.version_schema import EventVersion as EventVersionSchema, Changelog as ChangelogSchema, DiffResponse
-from ems.services import event_service, version_service, permission_service
+from ems.schemas.version_schema import EventVersion as EventVersionSchema, Changelog as ChangelogSchema, ChangelogPage, DiffResponse
+from ems.services import version_service, aio
+from ems.services.permission_service import EventAccess
 from ems.db import session
+from ems.db.session import DBSession
+from ems.utils.pagination import decode_cursor
+from ems.utils.responses import dumps, page_response, serialize_all
 
 
 
 router = APIRouter()
 
+# Rows fetched per query when streaming a changelog export
+CHANGELOG_STREAM_BATCH = 1000
+
 @router.get("/{event_id}/history/{version_id}", response_model=EventVersionSchema)
-def get_event_version(
+async def get_event_version(
     *,
-    db: Session = Depends(session.get_db),
+    db: DBSession = Depends(session.get_db),
     event_id: str = Path(...),
     version_id: int = Path(...),
-    current_user: User = Depends(deps.get_current_user)
+    access: EventAccess = Depends(deps.get_event_access("view"))
 ) -> Any:
     """
     Get a specific version of an event.
     """
-    # Check if event exists
-    event = event_service.get_by_id(db, event_id)
-    if not event:
-        raise HTTPException(status_code=404, detail="Event not found")
-    
-    # Check if user has access to this event
-    if str(event.owner_id) != str(current_user.id):
-        permission = permission_service.get_permission(db, str(event_id), str(current_user.id))
-        if not permission or not permission.can_view:
-            raise HTTPException(status_code=403, detail="Not enough permissions")
-    
     # Get the requested version
-    version = version_service.get_version_by_number(db, event_id, version_id)
+    version = await aio.version_service.get_version_by_number(db, event_id, version_id)
     if not version:
         raise HTTPException(status_code=404, detail="Version not found")
     
     return version
 
 @router.post("/{event_id}/rollback/{version_id}", response_model=EventSchema)
-def rollback_event(
+async def rollback_event(
     *,
-    db: Session = Depends(session.get_db),
+    db: DBSession = Depends(session.get_db),
     event_id: str = Path(...),
     version_id: int = Path(...),
+    access: EventAccess = Depends(deps.get_event_access("edit")),
     current_user: User = Depends(deps.get_current_user)
 ) -> Any:
     """
     Rollback to a previous version.
     """
-    # Check if event exists
-    event = event_service.get_by_id(db, event_id)
-    if not event:
-        raise HTTPException(status_code=404, detail="Event not found")
-    
-    # Check if user has edit permission
-    if str(event.owner_id) != str(current_user.id):
-        permission = permission_service.get_permission(db, str(event_id), str(current_user.id))
-        if not permission or not permission.can_edit:
-            raise HTTPException(status_code=403, detail="Not enough permissions")
-    
-    # Check if version exists
-    version = version_service.get_version_by_number(db, event_id, version_id)
-    if not version:
-        raise HTTPException(status_code=404, detail="Version not found")
-    
-    # Rollback the event
-    updated_event = version_service.rollback_event(db, event_id, version_id, str(current_user.id))
+    # Rollback the event; the event is known to exist, so None means no such version
+    try:
+        updated_event = await aio.version_service.rollback_event(db, event_id, version_id, str(current_user.id))
+    except StaleDataError:
+        raise HTTPException(status_code=409, detail="Event is being modified concurrently, try again")
     if not updated_event:
-        raise HTTPException(status_code=400, detail="Failed to rollback event")
+        raise HTTPException(status_code=404, detail="Version not found")
     
     return updated_event
 
-@router.get("/{event_id}/changelog", response_model=List[ChangelogSchema])
-def get_event_changelog(
+@router.get("/{event_id}/changelog", response_model=ChangelogPage)
+async def get_event_changelog(
     *,
-    db: Session = Depends(session.get_db),
+    response: Response,
+    db: DBSession = Depends(session.get_db),
     event_id: str = Path(...),
-    current_user: User = Depends(deps.get_current_user)
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    action: Optional[str] = None,
+    response_format: str = Query("json", alias="format", pattern="^(json|ndjson)$"),
+    access: EventAccess = Depends(deps.get_event_access("view"))
 ) -> Any:
     """
-    Get a chronological log of all changes to an event.
+    Get a log of changes to an event, newest first.
+    Use the returned `next_cursor` as `cursor` to fetch the next page.
+    With format=ndjson, every matching entry from the cursor on is streamed,
+    one JSON object per line, for exporting full history.
     """
-    # Check if event exists
-    event = event_service.get_by_id(db, event_id)
-    if not event:
-        raise HTTPException(status_code=404, detail="Event not found")
-    
-    # Check if user has access to this event
-    if str(event.owner_id) != str(current_user.id):
-        permission = permission_service.get_permission(db, str(event_id), str(current_user.id))
-        if not permission or not permission.can_view:
-            raise HTTPException(status_code=403, detail="Not enough permissions")
-    
-    # Get the changelog
-    changelogs = version_service.get_changelogs(db, event_id)
-    
-    # Add username to each changelog entry
-    result = []
-    for log in changelogs:
-        log_dict = {
-            "id": str(log.id),
-            "event_id": str(log.event_id),
-            "user_id": str(log.user_id),
-            "timestamp": log.timestamp,
-            "action": log.action,
-            "version_from": log.version_from,
-            "version_to": log.version_to,
-            "changes": log.changes,
-            "username": "Unknown"
-        }
-        
-        # Get username if user exists
-        if log.user_id:
-            user = db.query(User).filter(User.id == log.user_id).first()
-            if user:
-                log_dict["username"] = user.username
-        
-        result.append(ChangelogSchema.model_validate(log_dict))
-    
-    return result
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    filters = {"since": since, "until": until, "action": action}
+    
+    if response_format == "ndjson":
+        return StreamingResponse(
+            _stream_changelog(event_id, after, filters), media_type="application/x-ndjson",
+            headers=dict(response.headers)
+        )
+    
+    items, next_cursor = await aio.version_service.get_changelogs(
+        db, event_id, after=after, limit=limit, **filters
+    )
+    return page_response(ChangelogSchema, items, next_cursor, response)
+
+async def _stream_changelog(event_id: str, after, filters) -> AsyncIterator[bytes]:
+    # The request's session is closed before the body is sent, so stream from a new one
+    async with session.open_db() as db:
+        while True:
+            items, next_cursor = await aio.version_service.get_changelogs(
+                db, event_id, after=after, limit=CHANGELOG_STREAM_BATCH, **filters
+            )
+            for entry in serialize_all(ChangelogSchema, items):
+                yield dumps(entry) + b"\n"
+            if not next_cursor:
+                break
+            after = (items[-1].timestamp, items[-1].id)
 
 @router.get("/{event_id}/diff/{version_id1}/{version_id2}", response_model=DiffResponse)
-def get_event_diff(
+async def get_event_diff(
     *,
-    db: Session = Depends(session.get_db),
+    db: DBSession = Depends(session.get_db),
     event_id: str = Path(...),
     version_id1: int = Path(...),
     version_id2: int = Path(...),
-    current_user: User = Depends(deps.get_current_user)
+    blame: bool = False,
+    access: EventAccess = Depends(deps.get_event_access("view"))
 ) -> Any:
     """
-    Get a diff between two versions.
+    Get a diff between two versions, however far apart.
+    With blame=true, also report which version and user last changed each field.
     """
-    # Check if event exists
-    event = event_service.get_by_id(db, event_id)
-    if not event:
-        raise HTTPException(status_code=404, detail="Event not found")
-    
-    # Check if user has access to this event
-    if str(event.owner_id) != str(current_user.id):
-        permission = permission_service.get_permission(db, str(event_id), str(current_user.id))
-        if not permission or not permission.can_view:
-            raise HTTPException(status_code=403, detail="Not enough permissions")
-    
-    # Get the versions
-    version1 = version_service.get_version_by_number(db, event_id, version_id1)
-    if not version1:
-        raise HTTPException(status_code=404, detail=f"Version {version_id1} not found")
-    
-    version2 = version_service.get_version_by_number(db, event_id, version_id2)
-    if not version2:
-        raise HTTPException(status_code=404, detail=f"Version {version_id2} not found")
-    
-    # Generate diff
-    diff = version_service.generate_diff(version1.data, version2.data)
+    result = await aio.version_service.compose_diff(db, event_id, version_id1, version_id2)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Version not found")
     
     return {
         "event_id": event_id,
         "version1": version_id1,
         "version2": version_id2,
-        "diff": diff
-    }
\ No newline at end of file
+        "diff": result["diff"],
+        "blame": result["blame"] if blame else None
+    }
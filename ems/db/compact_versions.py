@@ -0,0 +1,38 @@
+# app/db/compact_versions.py
+"""
+Compact existing event history into keyframes and deltas.
+
+    python -m ems.db.compact_versions [--interval K] [--batch-size N]
+
+Rewrites each event's versions so every Kth one is a full snapshot
+(VERSION_KEYFRAME_INTERVAL by default); run `alembic upgrade head` first.
+Safe to run while the API is serving and to run again; --interval 1
+restores full snapshots.
+"""
+import argparse
+
+from ems.core.config import settings
+from ems.db.session import SessionLocal
+from ems.services import version_service
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--interval", type=int, default=settings.VERSION_KEYFRAME_INTERVAL,
+                        help="keep a full snapshot every this many versions")
+    parser.add_argument("--batch-size", type=int, default=100,
+                        help="events rewritten per transaction")
+    args = parser.parse_args()
+    if args.interval < 1:
+        parser.error("--interval must be at least 1")
+
+    db = SessionLocal()
+    try:
+        rewritten = version_service.compact_versions(db, args.interval, batch_size=args.batch_size)
+    finally:
+        db.close()
+    print(f"Rewrote {rewritten} version rows (keyframe interval {args.interval})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# app/db/pool.py
+import threading
+import time
+import uuid
+from typing import Any, Dict, Type
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, Pool, QueuePool
+
+from ems.core.config import settings
+
+
+class PoolMetrics:
+    """Checkout counters and gauges for one engine's connection pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.waits = 0  # Checkouts that found no idle connection and no overflow left
+        self.timeouts = 0
+        self.in_use = 0
+        self.checkout_seconds_total = 0.0
+        self.checkout_seconds_max = 0.0
+
+    def record_checkout(self, elapsed: float, waited: bool) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.waits += waited
+            self.checkout_seconds_total += elapsed
+            self.checkout_seconds_max = max(self.checkout_seconds_max, elapsed)
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def record_checkin(self) -> None:
+        with self._lock:
+            self.in_use -= 1
+
+    def snapshot(self, pool: Pool) -> Dict[str, Any]:
+        with self._lock:
+            data = {
+                "mode": settings.DB_POOL_MODE,
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+                "in_use": self.in_use,
+                "checkout_ms_avg": (
+                    1000 * self.checkout_seconds_total / self.checkouts if self.checkouts else 0.0
+                ),
+                "checkout_ms_max": 1000 * self.checkout_seconds_max,
+            }
+        if isinstance(pool, QueuePool):
+            data.update(size=pool.size(), idle=pool.checkedin(), overflow=pool.overflow())
+        return data
+
+
+class _InstrumentedPoolMixin:
+    metrics: PoolMetrics
+
+    def _exhausted(self) -> bool:
+        if not isinstance(self, QueuePool) or self._max_overflow < 0:
+            return False
+        return self.checkedin() == 0 and self.overflow() >= self._max_overflow
+
+    def _do_get(self):
+        waited = self._exhausted()
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record_timeout()
+            raise
+        self.metrics.record_checkout(time.perf_counter() - start, waited)
+        return conn
+
+    def _do_return_conn(self, record):
+        self.metrics.record_checkin()
+        return super()._do_return_conn(record)
+
+
+def instrumented(pool_class: Type[Pool], metrics: PoolMetrics) -> Type[Pool]:
+    """Subclass a pool so checkouts are recorded; survives engine.dispose()."""
+    return type(
+        f"Instrumented{pool_class.__name__}",
+        (_InstrumentedPoolMixin, pool_class),
+        {"metrics": metrics},
+    )
+
+
+sync_pool_metrics = PoolMetrics()
+async_pool_metrics = PoolMetrics()
+
+
+def get_engine_options(is_async: bool = False) -> Dict[str, Any]:
+    """
+    create_engine/create_async_engine keyword arguments from Settings.
+
+    DB_POOL_MODE='null' opens a connection per checkout and leaves pooling to
+    PgBouncer in transaction mode; asyncpg's prepared statement caches are
+    disabled since statements can't outlive a transaction there.
+    """
+    metrics = async_pool_metrics if is_async else sync_pool_metrics
+
+    if settings.DB_POOL_MODE == "null":
+        options: Dict[str, Any] = {"poolclass": instrumented(NullPool, metrics)}
+        if is_async:
+            options["connect_args"] = {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+            }
+        return options
+
+    queue_pool = AsyncAdaptedQueuePool if is_async else QueuePool
+    return {
+        "poolclass": instrumented(queue_pool, metrics),
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
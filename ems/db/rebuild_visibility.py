@@ -0,0 +1,32 @@
+# app/db/rebuild_visibility.py
+"""
+Rebuild the shared-events visibility index from event_permissions.
+
+    python -m ems.db.rebuild_visibility [--batch-size N]
+
+Replaces the contents of event_visibility (created by `alembic upgrade
+head`) with one row per non-owner grant. Run once after upgrading, or any
+time the index is suspected to have drifted.
+"""
+import argparse
+
+from ems.db.session import SessionLocal
+from ems.services import permission_service
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=5000,
+                        help="rows inserted per statement")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        count = permission_service.rebuild_visibility(db, batch_size=args.batch_size)
+    finally:
+        db.close()
+    print(f"Rebuilt {count} visibility rows")
+
+
+if __name__ == "__main__":
+    main()
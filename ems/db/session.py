@@ -1,19 +1,129 @@
 # app/db/session.py
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Optional, TypeVar, Union
+
+from sqlalchemy import Engine, create_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
 
 from ems.core.config import settings
+from ems.db.pool import async_pool_metrics, get_engine_options, sync_pool_metrics
+
+T = TypeVar("T")
+DBSession = Union[Session, AsyncSession]
 
 # Convert the PostgresDsn to a string
 database_url = str(settings.DATABASE_URI)
 
-engine = create_engine(database_url)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+_engine: Optional[Engine] = None
+
+def get_engine() -> Engine:
+    """
+    Created on first use, so importing the app neither loads the driver nor
+    needs the database; the schema itself is managed by Alembic.
+    """
+    global _engine
+    if _engine is None:
+        _engine = create_engine(database_url, **get_engine_options())
+    return _engine
+
+# Like the async sessions, objects stay loaded after commit rather than being re-read
+_session_factory = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False)
+
+def SessionLocal() -> Session:
+    """A sync session, the way sessionmaker(bind=engine)() would make one."""
+    return _session_factory(bind=get_engine())
+
+def get_async_database_url(url: str) -> str:
+    """Point a psycopg2-style URL at the asyncpg driver."""
+    scheme, _, rest = url.partition("://")
+    if scheme in ("postgres", "postgresql", "postgresql+psycopg2"):
+        scheme = "postgresql+asyncpg"
+    # asyncpg spells libpq's sslmode as ssl
+    return f"{scheme}://{rest.replace('sslmode=', 'ssl=')}"
+
+_async_engine: Optional[AsyncEngine] = None
+_async_session_factory: Optional[async_sessionmaker] = None
+
+def get_async_engine() -> AsyncEngine:
+    """Created on first use so the sync-only mode doesn't need asyncpg."""
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        _async_engine = create_async_engine(
+            get_async_database_url(database_url), **get_engine_options(is_async=True)
+        )
+        # Objects must stay readable after commit, outside the session's greenlet
+        _async_session_factory = async_sessionmaker(
+            _async_engine, autoflush=False, expire_on_commit=False
+        )
+    return _async_engine
 
-# Dependency
-def get_db():
+def get_pool_metrics() -> Dict[str, Any]:
+    """Pool gauges and checkout stats for each engine in use."""
+    metrics = {}
+    if _engine is not None:
+        metrics["sync"] = sync_pool_metrics.snapshot(_engine.pool)
+    if _async_engine is not None:
+        metrics["async"] = async_pool_metrics.snapshot(_async_engine.pool)
+    return metrics
+
+async def dispose_engines() -> None:
+    """Close every pooled connection, at shutdown; engines are recreated if used again."""
+    global _engine, _async_engine
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+    if _engine is not None:
+        _engine.dispose()
+        _engine = None
+
+def get_sync_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    get_async_engine()
+    async with _async_session_factory() as db:
+        yield db
+
+# Dependency; DATABASE_ASYNC picks the driver so both paths can be benchmarked
+get_db = get_async_db if settings.DATABASE_ASYNC else get_sync_db
+
+@asynccontextmanager
+async def open_db() -> AsyncIterator[DBSession]:
+    """
+    A session of the configured kind outside the request's dependencies, for
+    work that outlives them such as a streamed response body.
+    """
+    if settings.DATABASE_ASYNC:
+        get_async_engine()
+        async with _async_session_factory() as db:
+            yield db
+    else:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+async def run_db(db: DBSession, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Await a sync service function that takes the session as its first argument.
+    On an AsyncSession it runs on the event loop over asyncpg; on a sync
+    Session it is sent to the threadpool for the duration of the call only.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+async def release_connection(db: DBSession) -> None:
+    """
+    End the session's transaction so its connection goes back to the pool
+    before awaiting slow work that doesn't need it. Loaded objects stay
+    usable, and the next query checks a connection out again.
+    """
+    await run_db(db, Session.commit)
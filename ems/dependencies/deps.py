@@ -2,19 +2,19 @@
 from typing import Generator, Optional, Callable, Any
 from fastapi import Depends, HTTPException, status, Path
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt
 from pydantic import ValidationError
 from sqlalchemy.orm import Session
 import uuid
 
 from ems.core.config import settings
-from ems.utils.auth import is_token_blacklisted
-from ems.db.session import SessionLocal, get_db
+from ems.utils.auth import get_verified_token, is_token_blacklisted, remember_verified_token
+from ems.utils.token_blacklist import blacklist
+from ems.db.session import SessionLocal, DBSession, get_db, run_db
 from ems.models.user_model import User
 from ems.models.event_model import Event
-from ems.services import event_service, permission_service
+from ems.services import aio, permission_service
+from ems.services.permission_service import EventAccess
 from ems.schemas.token_schema import TokenPayload
-from ems.services import user_service
 
 oauth2_scheme = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/auth/login"
@@ -27,21 +27,35 @@ oauth2_scheme = OAuth2PasswordBearer(
 #     finally:
 #         db.close()
 
-def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
+async def get_current_user(
+    db: DBSession = Depends(get_db), token: str = Depends(oauth2_scheme)
 ) -> User:
-    if is_token_blacklisted(db, token):
+    # Non-blacklisted tokens are normally answered from memory
+    blacklisted = blacklist.lookup(token)
+    if blacklisted is None:
+        blacklisted = await run_db(db, is_token_blacklisted, token)
+    if blacklisted:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token is invalid or expired",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.JWT_ALGORITHM]
-        )
-        token_data = TokenPayload(**payload)
+    # A token reused across requests is verified and parsed once
+    token_data = get_verified_token(token)
+    if token_data is None:
+        from jose import jwt
+        try:
+            payload = jwt.decode(
+                token, settings.SECRET_KEY, algorithms=[settings.JWT_ALGORITHM]
+            )
+            token_data = TokenPayload(**payload)
+        except (jwt.JWTError, ValidationError):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
         
         if token_data.type != "access":
             raise HTTPException(
@@ -49,14 +63,10 @@ def get_current_user(
                 detail="Invalid token type",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-    except (jwt.JWTError, ValidationError):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        if payload.get("exp"):
+            remember_verified_token(token, token_data, payload["exp"])
     
-    user = user_service.get_by_id(db, token_data.sub)
+    user = await aio.user_service.get_by_id(db, token_data.sub)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     if not user.is_active:
@@ -64,54 +74,64 @@ def get_current_user(
     
     return user
 
+def _check_access(role: Optional[str], permission_type: str) -> None:
+    # A user with no grant at all has role None and no capabilities
+    if permission_type not in permission_service.ROLE_CAPABILITIES.get(role, ()):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Not enough permissions to {permission_type} this event"
+        )
+
 def get_event_with_permission(permission_type: str = "view"):
     """
     Dependency factory that returns a function to check if the user has access to an event.
     permission_type can be 'view', 'edit', 'delete', or 'share'.
+    The event and the caller's role are fetched together in one query.
     
     Usage:
         @router.get("/{event_id}")
-        def read_event(event: Event = Depends(get_event_with_permission("view"))):
+        async def read_event(event: Event = Depends(get_event_with_permission("view"))):
             return event
     """
-    def get_event(
+    async def get_event(
         event_id: uuid.UUID,
-        db: Session = Depends(get_db),
+        db: DBSession = Depends(get_db),
         current_user: User = Depends(get_current_user)
     ) -> Event:
-        # Get the event
-        event = event_service.get_by_id(db, event_id)
+        event, role = await aio.permission_service.get_event_and_role(db, event_id, current_user.id)
         if not event:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Event not found"
             )
-        
-        # Check if user is the owner
-        if event.owner_id != current_user.id:
-            # If not owner, check for specific permission
-            permission = permission_service.get_permission(
-                db, str(event_id), str(current_user.id)
-            )
-            
-            # Check permission based on the requested type
-            has_permission = False
-            if permission:
-                if permission_type == "view" and permission.can_view:
-                    has_permission = True
-                elif permission_type == "edit" and permission.can_edit:
-                    has_permission = True
-                elif permission_type == "delete" and permission.can_delete:
-                    has_permission = True
-                elif permission_type == "share" and permission.can_share:
-                    has_permission = True
-            
-            if not has_permission:
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail=f"Not enough permissions to {permission_type} this event"
-                )
-        
+        _check_access(role, permission_type)
         return event
     
     return get_event
+
+def get_event_access(permission_type: str = "view"):
+    """
+    Like get_event_with_permission, for routes that only need to know the
+    caller may act on the event. Returns an EventAccess (event id, owner id
+    and the caller's role), usually straight from the role cache.
+    
+    Usage:
+        @router.get("/{event_id}/changelog")
+        async def get_event_changelog(access: EventAccess = Depends(get_event_access("view"))):
+            ...
+    """
+    async def get_access(
+        event_id: uuid.UUID,
+        db: DBSession = Depends(get_db),
+        current_user: User = Depends(get_current_user)
+    ) -> EventAccess:
+        access = await aio.permission_service.get_event_access(db, event_id, current_user.id)
+        if not access:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Event not found"
+            )
+        _check_access(access.role, permission_type)
+        return access
+    
+    return get_access
@@ -2,5 +2,7 @@
 from ems.models.user_model import User
 from ems.models.token_model import TokenBlacklist
 from ems.models.event_model import Event
+from ems.models.occurrence_model import EventOccurrence
 from ems.models.permission_model import EventPermission
+from ems.models.visibility_model import EventVisibility
 from ems.models.version_model import EventVersion, EventChangelog
\ No newline at end of file
@@ -1,6 +1,6 @@
 # app/models/event.py
 import uuid
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, JSON, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
@@ -23,9 +23,27 @@ class Event(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     current_version = Column(Integer, default=1)
+    occurrences_until = Column(DateTime(timezone=True), nullable=True)  # Horizon of materialized occurrences
     
     # Relationships
     owner = relationship("User", back_populates="events")
     permissions = relationship("EventPermission", back_populates="event", cascade="all, delete-orphan")
     versions = relationship("EventVersion", back_populates="event", cascade="all, delete-orphan")
     changelogs = relationship("EventChangelog", back_populates="event", cascade="all, delete-orphan")
+    occurrences = relationship("EventOccurrence", back_populates="event", cascade="all, delete-orphan", passive_deletes=True)
+    
+    __mapper_args__ = {
+        # Server-generated columns come back in the INSERT/UPDATE's RETURNING
+        # clause, so a flushed event can be snapshotted without a refresh
+        "eager_defaults": True,
+        # Every UPDATE is guarded by WHERE current_version = <loaded value>;
+        # a concurrent edit makes the flush raise StaleDataError
+        "version_id_col": current_version,
+    }
+    
+    __table_args__ = (
+        # Serves the overlap predicate used for conflict detection
+        Index('ix_events_owner_start_end', 'owner_id', 'start_time', 'end_time'),
+        # Keyset pagination order for an owner's event list
+        Index('ix_events_owner_start_id', 'owner_id', 'start_time', 'id'),
+    )
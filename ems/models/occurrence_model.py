@@ -0,0 +1,28 @@
+# app/models/occurrence.py
+import uuid
+from sqlalchemy import Column, DateTime, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import UUID
+
+from ems.db.base import Base
+
+class EventOccurrence(Base):
+    """
+    Materialized occurrences of a recurring event, excluding the first one
+    (which is the event row itself). Rows are rebuilt per event whenever its
+    schedule changes and cover the series up to Event.occurrences_until.
+    """
+    __tablename__ = "event_occurrences"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    event_id = Column(UUID(as_uuid=True), ForeignKey("events.id", ondelete="CASCADE"), index=True)
+    owner_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"))
+    start_time = Column(DateTime(timezone=True))
+    end_time = Column(DateTime(timezone=True))
+    
+    # Relationships
+    event = relationship("Event", back_populates="occurrences")
+    
+    __table_args__ = (
+        Index('ix_event_occurrences_owner_start_end', 'owner_id', 'start_time', 'end_time'),
+    )
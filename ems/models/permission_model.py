@@ -1,6 +1,6 @@
 # app/models/permission.py
 import uuid
-from sqlalchemy import Column, String, DateTime, ForeignKey, Boolean, UniqueConstraint
+from sqlalchemy import Column, String, DateTime, ForeignKey, Boolean, UniqueConstraint, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
@@ -24,6 +24,10 @@ class EventPermission(Base):
     
     __table_args__ = (
         UniqueConstraint('event_id', 'user_id', name='event_user_uc'),
+        # Looks up the events shared with a user
+        Index('ix_event_permissions_user_event', 'user_id', 'event_id'),
+        # Keyset order of an event's permission listing
+        Index('ix_event_permissions_event_granted_id', 'event_id', 'granted_at', 'id'),
     )
 
     @property
@@ -10,6 +10,6 @@ class TokenBlacklist(Base):
     __tablename__ = "token_blacklist"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    token = Column(String, unique=True, index=True)
-    blacklisted_on = Column(DateTime(timezone=True), server_default=func.now())
-    expires_at = Column(DateTime(timezone=True))
\ No newline at end of file
+    token_hash = Column(String(64), unique=True, index=True)  # SHA-256 of the JWT
+    blacklisted_on = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    expires_at = Column(DateTime(timezone=True), index=True)
\ No newline at end of file
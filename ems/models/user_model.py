@@ -1,5 +1,5 @@
 # app/models/user.py
-from sqlalchemy import Boolean, Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ems.db.base import Base
@@ -21,4 +21,9 @@ class User(Base):
     # owner = relationship("User", back_populates="events")
     
     # Relationships - will be defined when the other models are created
-    event_permissions = relationship("EventPermission", foreign_keys="EventPermission.user_id", back_populates="user")
\ No newline at end of file
+    event_permissions = relationship("EventPermission", foreign_keys="EventPermission.user_id", back_populates="user")
+    
+    __table_args__ = (
+        # Emails are unique and match logins whatever their case
+        Index('ix_users_email_lower', func.lower(email), unique=True),
+    )
@@ -1,6 +1,6 @@
 # app/models/version.py
 import uuid
-from sqlalchemy import Column, String, DateTime, ForeignKey, JSON, Integer
+from sqlalchemy import Column, String, DateTime, ForeignKey, JSON, Integer, Boolean, Index, UniqueConstraint, true
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
@@ -13,7 +13,8 @@ class EventVersion(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     event_id = Column(UUID(as_uuid=True), ForeignKey("events.id", ondelete="CASCADE"), index=True)
     version_number = Column(Integer, index=True)
-    data = Column(JSON)  # Store complete event data as JSON
+    data = Column(JSON)  # Complete event data on keyframes, changed fields since the previous version otherwise
+    is_keyframe = Column(Boolean, nullable=False, default=True, server_default=true())
     created_by_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="SET NULL"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     change_description = Column(String, nullable=True)
@@ -22,8 +23,9 @@ class EventVersion(Base):
     event = relationship("Event", back_populates="versions")
     created_by = relationship("User")
     
-    class Meta:
-        unique_together = (("event_id", "version_number"),)
+    __table_args__ = (
+        UniqueConstraint('event_id', 'version_number', name='uq_event_versions_event_version'),
+    )
 
 class EventChangelog(Base):
     __tablename__ = "event_changelogs"
@@ -39,4 +41,11 @@ class EventChangelog(Base):
     
     # Relationships
     event = relationship("Event", back_populates="changelogs")
-    user = relationship("User")
\ No newline at end of file
+    user = relationship("User")
+    
+    __table_args__ = (
+        # Range scans over an event's history when composing diffs
+        Index('ix_event_changelogs_event_version_to', 'event_id', 'version_to'),
+        # Changelog pages: since/until ranges and the (timestamp, id) keyset order
+        Index('ix_event_changelogs_event_timestamp_id', 'event_id', 'timestamp', 'id'),
+    )
\ No newline at end of file
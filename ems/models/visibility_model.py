@@ -0,0 +1,23 @@
+# app/models/visibility.py
+from sqlalchemy import Column, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+
+from ems.db.base import Base
+
+class EventVisibility(Base):
+    """
+    One row per (user, event shared with them), carrying the event's time
+    span so a user's shared events can be listed in time order from a
+    single index. Maintained by permission_service alongside EventPermission.
+    """
+    __tablename__ = "event_visibility"
+    
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    event_id = Column(UUID(as_uuid=True), ForeignKey("events.id", ondelete="CASCADE"), primary_key=True)
+    start_time = Column(DateTime(timezone=True), nullable=False)
+    span_end = Column(DateTime(timezone=True), nullable=True)  # End of the last occurrence; NULL if the series never ends
+    
+    __table_args__ = (
+        # A user's shared events in (start_time, event_id) keyset order
+        Index('ix_event_visibility_user_start_event', 'user_id', 'start_time', 'event_id'),
+    )
@@ -1,6 +1,6 @@
 # src/ems/schemas/__init__.py
 from ems.schemas.user_schema import User, UserCreate, UserUpdate, UserInDB
 from ems.schemas.token_schema import Token, TokenPayload
-from ems.schemas.event_schema import Event, EventCreate, EventUpdate
-from ems.schemas.permission_schema import Permission, PermissionCreate, PermissionUpdate
-from ems.schemas.version_schema import EventVersion, Changelog, DiffResponse
\ No newline at end of file
+from ems.schemas.event_schema import Event, EventCreate, EventUpdate, EventPage, FreeBusyRequest, FreeBusyResponse, SuggestRequest, SuggestResponse
+from ems.schemas.permission_schema import Permission, PermissionCreate, PermissionUpdate, PermissionPage
+from ems.schemas.version_schema import EventVersion, Changelog, ChangelogPage, DiffResponse
\ No newline at end of file
@@ -1,9 +1,11 @@
 # app/schemas/event.py
-from typing import Optional, Dict, Any
-from pydantic import BaseModel, field_validator
-from datetime import datetime
+from typing import Optional, Dict, Any, List
+from pydantic import BaseModel, ValidationError, field_validator
+from datetime import datetime, time
 import uuid
 
+MAX_OCCURRENCES = 1000  # Largest `count` a recurrence pattern may have
+
 class RecurrencePatternBase(BaseModel):
     frequency: str  # 'daily', 'weekly', 'monthly', 'yearly'
     interval: int = 1
@@ -19,6 +21,51 @@ class RecurrencePatternBase(BaseModel):
         if v not in valid_frequencies:
             raise ValueError(f'Frequency must be one of {valid_frequencies}')
         return v
+    
+    @field_validator('interval')
+    @classmethod
+    def interval_must_be_valid(cls, v):
+        if not 1 <= v <= 1000:
+            raise ValueError('Interval must be between 1 and 1000')
+        return v
+    
+    @field_validator('count')
+    @classmethod
+    def count_must_be_valid(cls, v):
+        if v is not None and not 1 <= v <= MAX_OCCURRENCES:
+            raise ValueError(f'Count must be between 1 and {MAX_OCCURRENCES}')
+        return v
+    
+    @field_validator('days_of_week')
+    @classmethod
+    def days_of_week_must_be_valid(cls, v):
+        if v is not None and any(day not in range(7) for day in v):
+            raise ValueError('Days of week must be 0-6 for Monday-Sunday')
+        return v
+    
+    @field_validator('day_of_month')
+    @classmethod
+    def day_of_month_must_be_valid(cls, v):
+        if v is not None and not 1 <= v <= 31:
+            raise ValueError('Day of month must be between 1 and 31')
+        return v
+    
+    @field_validator('month_of_year')
+    @classmethod
+    def month_of_year_must_be_valid(cls, v):
+        if v is not None and not 1 <= v <= 12:
+            raise ValueError('Month of year must be between 1 and 12')
+        return v
+
+def validate_pattern(v: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Check a recurrence_pattern from a request against RecurrencePatternBase, keeping it as given."""
+    if v:
+        try:
+            RecurrencePatternBase.model_validate(v)
+        except ValidationError as e:
+            problems = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg'].removeprefix('Value error, ')}" for err in e.errors())
+            raise ValueError(f'Invalid recurrence pattern ({problems})')
+    return v
 
 class EventBase(BaseModel):
     title: str
@@ -41,7 +88,7 @@ class EventCreate(EventBase):
     def validate_recurrence(cls, v, info):
         if info.data.get('is_recurring', False) and not v:
             raise ValueError('Recurrence pattern required for recurring events')
-        return v
+        return validate_pattern(v)
 
 class EventUpdate(BaseModel):
     title: Optional[str] = None
@@ -51,6 +98,11 @@ class EventUpdate(BaseModel):
     location: Optional[str] = None
     is_recurring: Optional[bool] = None
     recurrence_pattern: Optional[Dict[str, Any]] = None
+    
+    @field_validator('recurrence_pattern')
+    @classmethod
+    def validate_recurrence(cls, v):
+        return validate_pattern(v)
 
 class EventInDBBase(EventBase):
     id: uuid.UUID
@@ -62,4 +114,91 @@ class EventInDBBase(EventBase):
     model_config = {"from_attributes": True}  # Pydantic v2 style
 
 class Event(EventInDBBase):
-    pass
\ No newline at end of file
+    pass
+
+class EventPage(BaseModel):
+    items: List[Event]
+    next_cursor: Optional[str] = None  # Pass back as `cursor` to get the next page
+
+class FreeBusyRequest(BaseModel):
+    user_ids: List[uuid.UUID]
+    start_time: datetime
+    end_time: datetime
+    
+    @field_validator('end_time')
+    @classmethod
+    def end_time_after_start_time(cls, v, info):
+        if 'start_time' in info.data and v <= info.data['start_time']:
+            raise ValueError('End time must be after start time')
+        return v
+
+class BusyInterval(BaseModel):
+    start_time: datetime
+    end_time: datetime
+
+class FreeBusyResponse(BaseModel):
+    start_time: datetime
+    end_time: datetime
+    users: Dict[uuid.UUID, List[BusyInterval]]  # Each user's merged busy intervals
+    combined: List[BusyInterval]  # When at least one of the users is busy
+
+class SlotEvent(BaseModel):
+    title: str
+    description: Optional[str] = None
+    location: Optional[str] = None
+
+class SuggestRequest(BaseModel):
+    user_ids: List[uuid.UUID] = []  # Besides the caller, who always takes part
+    start_time: datetime
+    end_time: datetime
+    duration_minutes: int
+    count: int = 5
+    step_minutes: int = 30  # Slots start this far apart, counted from working_hours_start
+    working_hours_start: time = time(9)
+    working_hours_end: time = time(17)
+    working_days: List[int] = [0, 1, 2, 3, 4]  # 0-6 for Monday-Sunday
+    timezone: str = "UTC"  # IANA name the working hours are in
+    create: Optional[SlotEvent] = None  # Create this event in the first slot still free
+    
+    @field_validator('end_time')
+    @classmethod
+    def end_time_after_start_time(cls, v, info):
+        if 'start_time' in info.data and v <= info.data['start_time']:
+            raise ValueError('End time must be after start time')
+        return v
+    
+    @field_validator('duration_minutes', 'step_minutes')
+    @classmethod
+    def minutes_must_be_positive(cls, v):
+        if not 0 < v <= 24 * 60:
+            raise ValueError('Must be between 1 and 1440 minutes')
+        return v
+    
+    @field_validator('count')
+    @classmethod
+    def count_must_be_valid(cls, v):
+        if not 1 <= v <= 100:
+            raise ValueError('Count must be between 1 and 100')
+        return v
+    
+    @field_validator('working_hours_end')
+    @classmethod
+    def working_hours_end_after_start(cls, v, info):
+        if 'working_hours_start' in info.data and v <= info.data['working_hours_start']:
+            raise ValueError('Working hours must end after they start')
+        return v
+    
+    @field_validator('working_days')
+    @classmethod
+    def working_days_must_be_valid(cls, v):
+        if not v or any(day not in range(7) for day in v):
+            raise ValueError('Working days must be 0-6 for Monday-Sunday')
+        return v
+
+class TimeSlot(BaseModel):
+    start_time: datetime
+    end_time: datetime
+
+class SuggestResponse(BaseModel):
+    slots: List[TimeSlot]
+    event: Optional[Event] = None  # The event created when `create` was given
@@ -1,5 +1,5 @@
 # app/schemas/permission.py
-from typing import Optional, List, Union
+from typing import Optional, List, Union, Dict
 from pydantic import BaseModel, field_validator
 from datetime import datetime
 import uuid
@@ -54,6 +54,10 @@ class PermissionInDBBase(PermissionBase):
 class Permission(PermissionInDBBase):
     username: str  # Include the username for display purposes
 
+class PermissionPage(BaseModel):
+    items: List[Permission]
+    next_cursor: Optional[str] = None  # Pass back as `cursor` to get the next page
+
 class UserRolePair(BaseModel):
     user_id: str
     role: str
@@ -66,5 +70,29 @@ class UserRolePair(BaseModel):
             raise ValueError(f'Role must be one of {valid_roles}')
         return v
 
+class ShareGroup(BaseModel):
+    user_ids: List[str]
+    role: str
+    
+    @field_validator('role')
+    @classmethod
+    def role_must_be_valid(cls, v):
+        valid_roles = ['owner', 'editor', 'viewer']
+        if v not in valid_roles:
+            raise ValueError(f'Role must be one of {valid_roles}')
+        return v
+
 class ShareEventRequest(BaseModel):
-    users: List[UserRolePair]
\ No newline at end of file
+    users: List[UserRolePair] = []
+    groups: List[ShareGroup] = []  # Lists of users who all get the same role
+    
+    def grants(self) -> Dict[str, str]:
+        """user_id -> role; a role given to a user individually overrides their group's"""
+        grants = {}
+        for group in self.groups:
+            grants.update(dict.fromkeys(group.user_ids, group.role))
+        grants.update((user_role.user_id, user_role.role) for user_role in self.users)
+        return grants
+
+class ShareEventsRequest(ShareEventRequest):
+    event_ids: List[str]
\ No newline at end of file
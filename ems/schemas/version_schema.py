@@ -40,7 +40,7 @@ class ChangelogCreate(ChangelogBase):
 class Changelog(ChangelogBase):
     id: Union[str, uuid.UUID]
     event_id: Union[str, uuid.UUID]
-    user_id: Union[str, uuid.UUID]
+    user_id: Optional[Union[str, uuid.UUID]] = None  # None once the user is deleted
     timestamp: datetime
     username: str  # Added for display purposes
     
@@ -54,8 +54,13 @@ class Changelog(ChangelogBase):
             return str(v)
         return v
 
+class ChangelogPage(BaseModel):
+    items: List[Changelog]
+    next_cursor: Optional[str] = None  # Pass back as `cursor` to get the next page
+
 class DiffResponse(BaseModel):
     event_id: str
     version1: int
     version2: int
-    diff: Dict[str, Any]
\ No newline at end of file
+    diff: Dict[str, Any]
+    blame: Optional[Dict[str, Any]] = None  # Field -> last version in the range that changed it, and by whom
\ No newline at end of file
@@ -0,0 +1,44 @@
+# app/services/aio.py
+"""
+Awaitable versions of the services, for use from async routes.
+
+    event = await aio.event_service.get_by_id(db, event_id)
+
+Each call runs the sync implementation through run_db, so query logic lives
+in one place and works with both the async and the sync session.
+"""
+from types import ModuleType
+from typing import Any, Callable, Coroutine
+
+from ems.db.session import run_db
+from ems.services import (
+    auth_service as _auth_service,
+    event_service as _event_service,
+    occurrence_service as _occurrence_service,
+    permission_service as _permission_service,
+    user_service as _user_service,
+    version_service as _version_service,
+)
+
+class AsyncService:
+    def __init__(self, module: ModuleType):
+        self._module = module
+
+    def __getattr__(self, name: str) -> Callable[..., Coroutine[Any, Any, Any]]:
+        fn = getattr(self._module, name)
+
+        async def call(db, *args, **kwargs):
+            return await run_db(db, fn, *args, **kwargs)
+
+        call.__name__ = name
+        call.__doc__ = fn.__doc__
+        # Cache so later lookups skip __getattr__
+        setattr(self, name, call)
+        return call
+
+auth_service = AsyncService(_auth_service)
+event_service = AsyncService(_event_service)
+occurrence_service = AsyncService(_occurrence_service)
+permission_service = AsyncService(_permission_service)
+user_service = AsyncService(_user_service)
+version_service = AsyncService(_version_service)
@@ -1,22 +1,27 @@
 # app/services/auth.py
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 from sqlalchemy.orm import Session
 
 from ems.core.config import settings
-from ems.utils.auth import create_access_token, create_refresh_token, is_token_blacklisted
-from ems.models.token_model import TokenBlacklist
+from ems.models.user_model import User
+from ems.utils.auth import create_access_token, create_refresh_token, forget_verified_token, is_token_blacklisted
+from ems.utils.token_blacklist import blacklist
 from ems.services import user_service
 
 def login(db: Session, username_or_email: str, password: str):
+    """
+    Check the credentials and issue tokens, all on this thread. Routes check
+    the password through password_pool and call issue_tokens instead.
+    """
     user = user_service.authenticate(db, username_or_email=username_or_email, password=password)
-    if not user:
+    if not user or not user.is_active:
         return None
-    if not user.is_active:
-        return None
-    
-    # Update last login
+    return issue_tokens(db, user)
+
+def issue_tokens(db: Session, user: User):
+    """Record the login and mint the token pair for a user whose password checked out."""
     user_service.update_last_login(db, user=user)
     
     # Create tokens
@@ -35,39 +40,38 @@ def login(db: Session, username_or_email: str, password: str):
     }
 
 def refresh_token(db: Session, token: str):
+    from jose import jwt
     try:
-        from jose import jwt
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[settings.JWT_ALGORITHM]
         )
-        
-        if payload.get("type") != "refresh":
-            return None
-        
-        if is_token_blacklisted(db, token):
-            return None
-        
-        user_id = int(payload.get("sub"))
-        user = user_service.get_by_id(db, user_id)
-        
-        if not user or not user.is_active:
-            return None
-        
-        access_token = create_access_token(user.id)
-        
-        # Add the user field to match the Token schema
-        return {
-            "access_token": access_token,
-            "token_type": "bearer",
-            "user": {
-                "id": user.id,
-                "username": user.username,
-                "email": user.email
-            }
-        }
-    except Exception as e:
-        print(f"Error in refresh_token: {e}")  # Add debugging
+    except jwt.JWTError:
+        return None
+    
+    if payload.get("type") != "refresh":
+        return None
+    
+    if is_token_blacklisted(db, token):
         return None
+    
+    # get_by_id takes the UUID subject as a string
+    user = user_service.get_by_id(db, payload.get("sub"))
+    
+    if not user or not user.is_active:
+        return None
+    
+    access_token = create_access_token(user.id)
+    
+    # Add the user field to match the Token schema
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "user": {
+            "id": user.id,
+            "username": user.username,
+            "email": user.email
+        }
+    }
 
 def logout(db: Session, token: str):
     try:
@@ -76,15 +80,11 @@ def logout(db: Session, token: str):
             token, settings.SECRET_KEY, algorithms=[settings.JWT_ALGORITHM]
         )
         
-        expire = datetime.fromtimestamp(payload.get("exp"))
+        expire = datetime.fromtimestamp(payload.get("exp"), tz=timezone.utc)
         
         # Add token to blacklist
-        db_obj = TokenBlacklist(
-            token=token,
-            expires_at=expire
-        )
-        db.add(db_obj)
-        db.commit()
+        blacklist.add(db, token, expire)
+        forget_verified_token(token)
         
         return True
     except:
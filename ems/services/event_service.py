@@ -1,38 +1,148 @@
 # app/services/event.py
-from typing import List, Optional, Dict, Any
-from datetime import datetime, timedelta
+from typing import List, Optional, Dict, Any, Tuple, Callable, Collection, TypeVar
+from datetime import datetime, time, timedelta, tzinfo
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy import and_, or_, func, tuple_, select, union, insert
 import uuid
 
+from ems.core.config import settings
 from ems.models.event_model import Event
 from ems.schemas.event_schema import EventCreate, EventUpdate
+from ems.utils.cache import TTLCache
+
+T = TypeVar("T")
+Span = Tuple[datetime, datetime]
+
+# Fields whose change moves an event's occurrences
+SCHEDULE_FIELDS = {"start_time", "end_time", "is_recurring", "recurrence_pattern"}
+
+# owner_id -> {bucket start: merged busy spans within the bucket}; dropped on any write to the owner's events
+_free_busy_cache: TTLCache[Dict[datetime, List[Span]]] = TTLCache(
+    settings.FREE_BUSY_CACHE_SIZE, settings.FREE_BUSY_CACHE_TTL_SECONDS
+)
 
 def get_by_id(db: Session, event_id: uuid.UUID) -> Optional[Event]:
     return db.query(Event).filter(Event.id == event_id).first()
 
-def get_by_owner(db: Session, owner_id: uuid.UUID, skip: int = 0, limit: int = 100) -> List[Event]:
-    return db.query(Event).filter(Event.owner_id == owner_id).offset(skip).limit(limit).all()
+def _listed(as_rows: bool) -> tuple:
+    """What event listings select: Event objects, or Core rows of just an Event response's columns."""
+    if not as_rows:
+        return (Event,)
+    from ems.schemas.event_schema import Event as EventSchema
+    from ems.utils.responses import response_columns
+    return response_columns(EventSchema, Event)
+
+def get_by_owner(db: Session, owner_id: uuid.UUID, after: Optional[Tuple[datetime, uuid.UUID]] = None, limit: int = 100,
+                 as_rows: bool = False) -> List[Event]:
+    """
+    Return the owner's events ordered by (start_time, id), starting after the
+    given keyset position. Every page is an index range scan, however deep.
+    With as_rows, they come back as read-only rows in the Event schema's
+    shape, skipping ORM loading.
+    """
+    query = db.query(*_listed(as_rows)).filter(Event.owner_id == owner_id)
+    if after:
+        query = query.filter(tuple_(Event.start_time, Event.id) > tuple_(*after))
+    return query.order_by(Event.start_time, Event.id).limit(limit).all()
+
+def get_shared_events(db: Session, user_id: uuid.UUID, start_date: Optional[datetime] = None,
+                      end_date: Optional[datetime] = None, after: Optional[Tuple[datetime, uuid.UUID]] = None,
+                      limit: int = 100, as_rows: bool = False) -> Tuple[List[Event], Optional[str]]:
+    """
+    Return a page of the events other users have shared with this user,
+    ordered by (start_time, id), optionally only those overlapping
+    [start_date, end_date), with the cursor for the next page.
+    Reads the user's event_visibility rows in index order and fetches just
+    the page's events, however many grants the user has. as_rows is as for
+    get_by_owner.
+    """
+    from ems.models.visibility_model import EventVisibility
+    from ems.utils.pagination import paginate
+    
+    query = db.query(*_listed(as_rows)).join(
+        EventVisibility,
+        and_(EventVisibility.event_id == Event.id, EventVisibility.user_id == user_id)
+    )
+    if end_date:
+        query = query.filter(EventVisibility.start_time < end_date)
+    if start_date:
+        query = query.filter(or_(EventVisibility.span_end.is_(None), EventVisibility.span_end > start_date))
+    if after:
+        query = query.filter(tuple_(EventVisibility.start_time, EventVisibility.event_id) > tuple_(*after))
+    
+    events = query.order_by(EventVisibility.start_time, EventVisibility.event_id).limit(limit + 1).all()
+    return paginate(events, limit, key=lambda event: (event.start_time, event.id))
 
-def get_events_in_range(db: Session, start_date: datetime, end_date: datetime, owner_id: Optional[int] = None) -> List[Event]:
-    query = db.query(Event).filter(
-        and_(
-            Event.start_time >= start_date,
-            Event.end_time <= end_date
+def get_events_in_range(db: Session, start_date: datetime, end_date: datetime, user_id: uuid.UUID,
+                        after: Optional[Tuple[datetime, uuid.UUID]] = None,
+                        limit: int = 100, as_rows: bool = False) -> Tuple[List[Event], Optional[str]]:
+    """
+    Return one page of events visible to the user (owned or shared with them)
+    that overlap [start_date, end_date), ordered by (start_time, id), along
+    with the cursor for the next page. Pages are full unless they are the last.
+    
+    Owned and shared events, and the materialized occurrences of recurring
+    ones, are matched by a single UNION query, each branch served by an index.
+    as_rows is as for get_by_owner.
+    """
+    from ems.models.occurrence_model import EventOccurrence
+    from ems.models.permission_model import EventPermission
+    from ems.utils.pagination import paginate
+    from ems.utils.recurrence import iter_occurrences
+    
+    overlaps = (Event.start_time < end_date, Event.end_time > start_date)
+    occurrence_overlaps = (EventOccurrence.start_time < end_date, EventOccurrence.end_time > start_date)
+    # Recurring series whose occurrences in the range were never materialized
+    unexpanded = (
+        Event.is_recurring.is_(True),
+        Event.start_time < end_date,
+        or_(Event.occurrences_until.is_(None), Event.occurrences_until < end_date)
+    )
+    
+    candidate_ids = []
+    for criteria in (overlaps, unexpanded):
+        candidate_ids.append(select(Event.id).where(Event.owner_id == user_id, *criteria))
+        candidate_ids.append(
+            select(Event.id)
+            .join(EventPermission, EventPermission.event_id == Event.id)
+            .where(EventPermission.user_id == user_id, *criteria)
         )
+    candidate_ids.append(
+        select(EventOccurrence.event_id).where(EventOccurrence.owner_id == user_id, *occurrence_overlaps)
+    )
+    candidate_ids.append(
+        select(EventOccurrence.event_id)
+        .join(EventPermission, EventPermission.event_id == EventOccurrence.event_id)
+        .where(EventPermission.user_id == user_id, *occurrence_overlaps)
     )
     
-    if owner_id:
-        query = query.filter(Event.owner_id == owner_id)
+    query = db.query(*_listed(as_rows)).filter(Event.id.in_(union(*candidate_ids)))
     
-    return query.all()
+    # Unexpanded series are only candidates; keep those with an occurrence in
+    # the range, reading on until the page is full or the candidates run out
+    visible = []
+    while True:
+        batch_query = query
+        if after:
+            batch_query = batch_query.filter(tuple_(Event.start_time, Event.id) > tuple_(*after))
+        events = batch_query.order_by(Event.start_time, Event.id).limit(limit + 1).all()
+        visible.extend(
+            event for event in events
+            if (event.start_time < end_date and event.end_time > start_date)
+            or next(iter_occurrences(event.start_time, event.end_time, event.recurrence_pattern, start_date, end_date), None)
+        )
+        if len(visible) > limit or len(events) <= limit:
+            break
+        after = (events[-1].start_time, events[-1].id)
+    return paginate(visible, limit, key=lambda event: (event.start_time, event.id))
 
 def create(db: Session, *, obj_in: EventCreate, owner_id: str) -> Event:
-    # Double-check for conflicts before creating
-    conflicts = check_for_conflicts(db, obj_in.start_time, obj_in.end_time, owner_id)
-    if conflicts:
-        # Log a warning if we somehow got here with conflicts
-        print(f"WARNING: Creating event despite conflicts: {[str(c.id) for c in conflicts]}")
+    """
+    Insert the event with its first version, changelog entry and occurrences
+    in one transaction. Callers check for conflicts first.
+    """
+    from ems.services import occurrence_service, version_service
     
     db_obj = Event(
         title=obj_in.title,
@@ -43,29 +153,147 @@ def create(db: Session, *, obj_in: EventCreate, owner_id: str) -> Event:
         is_recurring=obj_in.is_recurring,
         recurrence_pattern=obj_in.recurrence_pattern,
         owner_id=owner_id,
+        current_version=1,
+        updated_at=None,  # Known rather than loaded back for the snapshot
     )
+    occurrence_service.set_horizon(db_obj)
     db.add(db_obj)
-    db.commit()
-    db.refresh(db_obj)
+    # INSERT ... RETURNING fills in the server defaults the snapshot needs
+    db.flush()
+    
     # Create initial version and changelog
-    from ems.services import version_service
     version = version_service.create_version(db, db_obj, owner_id, "Initial version")
     version_service.create_changelog(
         db, 
-        str(db_obj.id), 
+        db_obj.id, 
         owner_id, 
         'create', 
         None, 
         version.version_number, 
         None
     )
+    occurrence_service.materialize_occurrences(db, [db_obj])
+    db.commit()
+    invalidate_free_busy(owner_id)
     return db_obj
 
-def update(db: Session, *, db_obj: Event, obj_in: EventUpdate) -> Event:
-    # Store the original data for diff
-    from ems.services import version_service
-    latest_version = version_service.get_latest_version(db, str(db_obj.id))
-    old_data = latest_version.data if latest_version else None
+def lock_owner(db: Session, owner_id: uuid.UUID) -> None:
+    """
+    Take the owner's advisory lock until the transaction ends, serializing
+    conflict checks and the inserts that follow them.
+    """
+    db.execute(select(func.pg_advisory_xact_lock(func.hashtextextended(str(owner_id), 0))))
+
+def create_if_free(db: Session, *, obj_in: EventCreate, owner_id: uuid.UUID,
+                   attendee_ids: List[uuid.UUID] = ()) -> Tuple[Optional[Event], List[uuid.UUID]]:
+    """
+    Create the event unless it conflicts with the owner's events or, for a
+    single event, falls in busy time of any attendee. Returns the event, or
+    None and the IDs of the owner's conflicting events.
+    
+    The check and the insert share one transaction holding a per-owner
+    advisory lock, so concurrent requests can't both take the same time.
+    """
+    from ems.services import occurrence_service
+    
+    lock_owner(db, owner_id)
+    conflicts = check_for_conflicts(
+        db,
+        obj_in.start_time,
+        obj_in.end_time,
+        str(owner_id),
+        recurrence_pattern=obj_in.recurrence_pattern if obj_in.is_recurring else None
+    )
+    attendee_ids = [user_id for user_id in attendee_ids if str(user_id) != str(owner_id)]
+    if not conflicts and attendee_ids and not obj_in.is_recurring:
+        busy = occurrence_service.get_busy_spans(db, attendee_ids, obj_in.start_time, obj_in.end_time)
+        if any(busy.values()):
+            db.rollback()
+            return None, []
+    if conflicts:
+        # Ends the transaction and releases the lock
+        db.rollback()
+        return None, conflicts
+    return create(db, obj_in=obj_in, owner_id=owner_id), []
+
+def retry_on_stale(db: Session, write: Callable[[], T], retries: Optional[int] = None) -> T:
+    """
+    Run a write that flushes an Event and commits. If a concurrent edit
+    bumped current_version first, roll back and run it again; the rollback
+    expires the event, so the next attempt starts from the committed row.
+    StaleDataError propagates once EVENT_WRITE_RETRIES are used up.
+    """
+    retries = settings.EVENT_WRITE_RETRIES if retries is None else retries
+    for attempt in range(retries + 1):
+        try:
+            return write()
+        except StaleDataError:
+            db.rollback()
+            if attempt == retries:
+                raise
+
+def check_version(db_obj: Event, expected_versions: Optional[Collection[int]]) -> None:
+    """
+    Raise StaleDataError unless the event is at one of expected_versions,
+    the versions the client read (from If-Match). None accepts any version.
+    """
+    if expected_versions is not None and db_obj.current_version not in expected_versions:
+        raise StaleDataError(
+            f"Event {db_obj.id} is at version {db_obj.current_version}, not one of {sorted(expected_versions)}"
+        )
+
+def update_if_free(db: Session, *, db_obj: Event, obj_in: EventUpdate,
+                   expected_versions: Optional[Collection[int]] = None) -> Tuple[Optional[Event], List[uuid.UUID]]:
+    """
+    Apply the update unless its new schedule conflicts with the owner's
+    other events, writing the new version, changelog entry and any rebuilt
+    occurrences in one transaction. Returns the event, or None and the IDs
+    of the conflicting events.
+    
+    A schedule change is checked and written holding the same lock as
+    create_if_free. With expected_versions, StaleDataError is raised if the
+    event is at any other version, as loaded or when the UPDATE runs.
+    Without them, an edit that loses a race is checked again and re-applied
+    on top of the winner.
+    """
+    def attempt() -> Tuple[Optional[Event], List[uuid.UUID]]:
+        check_version(db_obj, expected_versions)
+        if obj_in.model_fields_set & SCHEDULE_FIELDS:
+            lock_owner(db, db_obj.owner_id)
+            conflicts = _update_conflicts(db, db_obj, obj_in)
+            if conflicts:
+                # Ends the transaction and releases the lock
+                db.rollback()
+                return None, conflicts
+        return _update(db, db_obj, obj_in), []
+    
+    if expected_versions is None:
+        return retry_on_stale(db, attempt)
+    return attempt()
+
+def _update_conflicts(db: Session, db_obj: Event, obj_in: EventUpdate) -> List[uuid.UUID]:
+    """The owner's other events that the event would overlap once updated."""
+    is_recurring = db_obj.is_recurring if obj_in.is_recurring is None else obj_in.is_recurring
+    recurrence_pattern = (
+        obj_in.recurrence_pattern
+        if "recurrence_pattern" in obj_in.model_fields_set
+        else db_obj.recurrence_pattern
+    )
+    return check_for_conflicts(
+        db,
+        obj_in.start_time or db_obj.start_time,
+        obj_in.end_time or db_obj.end_time,
+        str(db_obj.owner_id),
+        str(db_obj.id),
+        recurrence_pattern=recurrence_pattern if is_recurring else None
+    )
+
+def _update(db: Session, db_obj: Event, obj_in: EventUpdate) -> Event:
+    from ems.services import occurrence_service, permission_service, version_service
+    
+    # The loaded event is the latest version, so the diff needs no query
+    old_data = version_service.event_to_dict(db_obj)
+    old_version = db_obj.current_version
 
     # Event Update
     update_data = obj_in.model_dump(exclude_unset=True)
@@ -76,132 +304,367 @@ def update(db: Session, *, db_obj: Event, obj_in: EventUpdate) -> Event:
     for field, value in update_data.items():
         setattr(db_obj, field, value)
     
+    schedule_changed = bool(update_data.keys() & SCHEDULE_FIELDS)
+    if schedule_changed:
+        occurrence_service.set_horizon(db_obj)
+    
     db.add(db_obj)
-    db.commit()
-    db.refresh(db_obj)
+    # UPDATE ... RETURNING brings back updated_at for the snapshot
+    db.flush()
     
     new_version = version_service.create_version(
         db, 
         db_obj, 
         db_obj.owner_id, 
-        "Update event"
+        "Update event",
+        previous_data=old_data
     )
     
     # Generate diff and create changelog
-    if old_data:
-        # Create event data for diff
-        event_data = {
-            "id": str(db_obj.id),
-            "title": db_obj.title,
-            "description": db_obj.description,
-            "start_time": db_obj.start_time.isoformat() if db_obj.start_time else None,
-            "end_time": db_obj.end_time.isoformat() if db_obj.end_time else None,
-            "location": db_obj.location,
-            "is_recurring": db_obj.is_recurring,
-            "recurrence_pattern": db_obj.recurrence_pattern,
-            "owner_id": str(db_obj.owner_id),
-            "created_at": db_obj.created_at.isoformat() if db_obj.created_at else None,
-            "updated_at": db_obj.updated_at.isoformat() if db_obj.updated_at else None,
-            "current_version": db_obj.current_version
-        }
-        
-        changes = version_service.generate_diff(old_data, event_data)
-        version_service.create_changelog(
-            db,
-            str(db_obj.id),
-            str(db_obj.owner_id),
-            'update',
-            latest_version.version_number,
-            new_version.version_number,
-            changes
-        )
+    changes = version_service.generate_diff(old_data, version_service.event_to_dict(db_obj))
+    version_service.create_changelog(
+        db,
+        db_obj.id,
+        db_obj.owner_id,
+        'update',
+        old_version,
+        new_version.version_number,
+        changes
+    )
+    
+    # Rebuild materialized occurrences and the shared-events feed if the schedule changed
+    if schedule_changed:
+        occurrence_service.refresh_occurrences(db, db_obj)
+        permission_service.sync_visibility(db, db_obj)
+    
+    db.commit()
+    if schedule_changed:
+        invalidate_free_busy(db_obj.owner_id)
     return db_obj
 
-def delete(db: Session, *, db_obj: Event) -> None:
+def delete(db: Session, *, db_obj: Event, expected_versions: Optional[Collection[int]] = None) -> None:
+    """Delete the event; StaleDataError as for update, without re-applying."""
+    check_version(db_obj, expected_versions)
+    event_id, owner_id = db_obj.id, db_obj.owner_id
     db.delete(db_obj)
     db.commit()
+    from ems.services import permission_service
+    permission_service.invalidate_event_roles(event_id)
+    invalidate_free_busy(owner_id)
 
-def create_batch(db: Session, *, obj_in_list: List[EventCreate], owner_id: int) -> List[Event]:
-    db_objs = []
-    for obj_in in obj_in_list:
-        db_obj = Event(
-            title=obj_in.title,
-            description=obj_in.description,
-            start_time=obj_in.start_time,
-            end_time=obj_in.end_time,
-            location=obj_in.location,
-            is_recurring=obj_in.is_recurring,
-            recurrence_pattern=obj_in.recurrence_pattern,
-            owner_id=owner_id,
-        )
-        db.add(db_obj)
-        db_objs.append(db_obj)
+def create_batch_if_free(db: Session, *, obj_in_list: List[EventCreate],
+                         owner_id: uuid.UUID) -> Tuple[List[Event], List[uuid.UUID]]:
+    """
+    Create the batch unless it conflicts with the owner's events. Returns the
+    events, or an empty list and the IDs of the conflicting events. Holds the
+    same lock as create_if_free while checking and inserting.
+    """
+    lock_owner(db, owner_id)
+    conflicts = check_batch_conflicts(db, obj_in_list, str(owner_id))
+    if conflicts:
+        # Ends the transaction and releases the lock
+        db.rollback()
+        return [], conflicts
+    return create_batch(db, obj_in_list=obj_in_list, owner_id=owner_id), []
+
+def create_batch(db: Session, *, obj_in_list: List[EventCreate], owner_id: uuid.UUID) -> List[Event]:
+    """
+    Insert all events with one multi-row INSERT ... RETURNING, then write their
+    initial versions, changelogs and occurrences in bulk and commit once.
+    """
+    if not obj_in_list:
+        return []
     
+    from ems.services import occurrence_service, version_service
+    rows = [
+        {
+            "title": obj_in.title,
+            "description": obj_in.description,
+            "start_time": obj_in.start_time,
+            "end_time": obj_in.end_time,
+            "location": obj_in.location,
+            "is_recurring": obj_in.is_recurring,
+            "recurrence_pattern": obj_in.recurrence_pattern,
+            "owner_id": owner_id,
+            "occurrences_until": occurrence_service.get_horizon(
+                obj_in.start_time, obj_in.is_recurring, obj_in.recurrence_pattern
+            ),
+        }
+        for obj_in in obj_in_list
+    ]
+    db_objs = db.scalars(
+        insert(Event).returning(Event, sort_by_parameter_order=True), rows
+    ).all()
+    
+    version_service.create_initial_versions(db, db_objs, owner_id)
+    occurrence_service.materialize_occurrences(db, db_objs)
     db.commit()
-    for obj in db_objs:
-        db.refresh(obj)
+    invalidate_free_busy(owner_id)
     
     return db_objs
 
-def check_for_conflicts(db: Session, start_time: datetime, end_time: datetime, owner_id: str, event_id: Optional[str] = None) -> List[Event]:
+def _batch_intervals(obj_in_list: List[EventCreate]) -> List[tuple]:
+    """(index, start, end) for every occurrence of every event in a batch."""
+    from datetime import timezone
+    from ems.services import occurrence_service
+    from ems.utils.recurrence import iter_occurrences
+    
+    intervals = []
+    for index, obj_in in enumerate(obj_in_list):
+        start_time, end_time = obj_in.start_time, obj_in.end_time
+        # Stored times are timezone-aware; treat naive input as UTC
+        if not start_time.tzinfo:
+            start_time = start_time.replace(tzinfo=timezone.utc)
+        if not end_time.tzinfo:
+            end_time = end_time.replace(tzinfo=timezone.utc)
+        
+        if obj_in.is_recurring and obj_in.recurrence_pattern:
+            horizon = occurrence_service.horizon_for(start_time)
+            occurrences = iter_occurrences(start_time, end_time, obj_in.recurrence_pattern, window_end=horizon)
+        else:
+            occurrences = [(start_time, end_time)]
+        intervals.extend((index, occ_start, occ_end) for occ_start, occ_end in occurrences)
+    return intervals
+
+def find_batch_overlaps(obj_in_list: List[EventCreate]) -> List[Tuple[int, int]]:
+    """
+    Return index pairs of events in the batch that overlap each other,
+    found with a single sort-and-sweep pass.
+    """
+    from ems.utils.intervals import find_internal_overlaps
+    
+    pairs = {tuple(sorted(pair)) for pair in find_internal_overlaps(_batch_intervals(obj_in_list))}
+    return sorted(pairs)
+
+def check_batch_conflicts(db: Session, obj_in_list: List[EventCreate], owner_id: str) -> List[uuid.UUID]:
+    """
+    Return the IDs of the owner's events that overlap any event in the batch.
+    Existing events across the batch's span are fetched once and swept against
+    the merged batch intervals, instead of querying once per event.
+    """
+    from ems.services import occurrence_service
+    from ems.utils.intervals import merge_intervals, sweep_overlaps
+    
+    intervals = _batch_intervals(obj_in_list)
+    if not intervals:
+        return []
+    
+    merged = merge_intervals([(start, end) for _, start, end in intervals])
+    existing = occurrence_service.get_busy_intervals(
+        db,
+        merged[0][0],
+        max(end for _, end in merged),
+        owner_id=owner_id
+    )
+    
+    conflicts = []
+    for conflict_id in sweep_overlaps(merged, existing):
+        if conflict_id not in conflicts:
+            conflicts.append(conflict_id)
+    return conflicts
+
+def check_for_conflicts(db: Session, start_time: datetime, end_time: datetime, owner_id: str,
+                        event_id: Optional[str] = None,
+                        recurrence_pattern: Optional[Dict[str, Any]] = None) -> List[uuid.UUID]:
+    """
+    Return the IDs of the owner's events that overlap [start_time, end_time).
+    When a recurrence pattern is given, every occurrence of the new series up to
+    the materialization horizon is checked. Existing recurring events are
+    matched on all of their occurrences, not just the first.
+    """
+    from datetime import timezone
+    from ems.services import occurrence_service
+    from ems.utils.intervals import sweep_overlaps
+    from ems.utils.recurrence import iter_occurrences
+    
+    # Stored times are timezone-aware; treat naive input as UTC
+    if not start_time.tzinfo:
+        start_time = start_time.replace(tzinfo=timezone.utc)
+    if not end_time.tzinfo:
+        end_time = end_time.replace(tzinfo=timezone.utc)
+    
+    if recurrence_pattern:
+        horizon = occurrence_service.horizon_for(start_time)
+        new_intervals = list(iter_occurrences(start_time, end_time, recurrence_pattern, window_end=horizon))
+    else:
+        new_intervals = [(start_time, end_time)]
+    
+    existing = occurrence_service.get_busy_intervals(
+        db,
+        new_intervals[0][0],
+        new_intervals[-1][1],
+        owner_id=owner_id,
+        exclude_event_id=event_id
+    )
+    
+    conflicts = []
+    for conflict_id in sweep_overlaps(new_intervals, existing):
+        if conflict_id not in conflicts:
+            conflicts.append(conflict_id)
+    return conflicts
+
+def _free_busy_buckets(start_time: datetime, end_time: datetime) -> List[datetime]:
+    """Start of every cache bucket that [start_time, end_time) touches, aligned to the epoch."""
+    from datetime import timezone
+    
+    size = timedelta(hours=settings.FREE_BUSY_BUCKET_HOURS)
+    epoch = datetime(1970, 1, 1, tzinfo=timezone.utc)
+    bucket = epoch + (start_time - epoch) // size * size
+    buckets = []
+    while bucket < end_time:
+        buckets.append(bucket)
+        bucket += size
+    return buckets
+
+def _split_by_bucket(spans: List[Span], buckets: List[datetime], size: timedelta) -> Dict[datetime, List[Span]]:
+    """Cut sorted, disjoint spans at the bucket edges, in one pass over both."""
+    by_bucket: Dict[datetime, List[Span]] = {bucket: [] for bucket in buckets}
+    for start, end in spans:
+        index = max(0, (start - buckets[0]) // size)
+        while index < len(buckets) and buckets[index] < end:
+            bucket = buckets[index]
+            by_bucket[bucket].append((max(start, bucket), min(end, bucket + size)))
+            index += 1
+    return by_bucket
+
+def _busy_by_bucket(db: Session, user_ids: List[uuid.UUID], start_time: datetime,
+                    end_time: datetime) -> Tuple[Dict[uuid.UUID, Dict[datetime, List[Span]]], List[datetime]]:
+    """
+    Each user's merged busy spans in every bucket that [start_time, end_time)
+    touches, and those buckets in order. Users missing any of the buckets
+    from the cache are loaded together with one query over the bucket span.
+    """
+    from ems.services import occurrence_service
+    from ems.utils.intervals import merge_intervals
+    
+    size = timedelta(hours=settings.FREE_BUSY_BUCKET_HOURS)
+    buckets = _free_busy_buckets(start_time, end_time)
+    needed = set(buckets)
+    busy: Dict[uuid.UUID, Dict[datetime, List[Span]]] = {}
+    missing = []
+    for user_id in dict.fromkeys(user_ids):
+        cached = _free_busy_cache.get(user_id) or {}
+        if cached.keys() >= needed:
+            busy[user_id] = cached
+        else:
+            missing.append(user_id)
+    
+    if missing:
+        fetched = occurrence_service.get_busy_spans(db, missing, buckets[0], buckets[-1] + size)
+        for user_id in missing:
+            by_bucket = _split_by_bucket(merge_intervals(fetched[user_id]), buckets, size)
+            busy[user_id] = {**(_free_busy_cache.get(user_id) or {}), **by_bucket}
+            _free_busy_cache.set(user_id, busy[user_id])
+    return busy, buckets
+
+def get_free_busy(db: Session, user_ids: List[uuid.UUID], start_time: datetime,
+                  end_time: datetime) -> Tuple[Dict[uuid.UUID, List[Span]], List[Span]]:
+    """
+    Return each user's merged busy intervals within [start_time, end_time),
+    recurring events included, and the intervals when any of them is busy.
+    
+    Busy time is cached per user in fixed buckets; whatever is missing is
+    loaded with one query and merged with a sort-and-sweep pass.
+    """
+    from datetime import timezone
+    from ems.utils.intervals import clip_intervals, merge_intervals
     
+    # Stored times are timezone-aware; treat naive input as UTC
+    if not start_time.tzinfo:
+        start_time = start_time.replace(tzinfo=timezone.utc)
+    if not end_time.tzinfo:
+        end_time = end_time.replace(tzinfo=timezone.utc)
+    
+    busy, buckets = _busy_by_bucket(db, user_ids, start_time, end_time)
+    # Spans split at bucket edges join up again when merged
+    per_user = {
+        user_id: clip_intervals(
+            merge_intervals([span for bucket in buckets for span in by_bucket[bucket]]), start_time, end_time
+        )
+        for user_id, by_bucket in busy.items()
+    }
+    combined = merge_intervals([span for spans in per_user.values() for span in spans])
+    return per_user, combined
+
+def suggest_slots(db: Session, user_ids: List[uuid.UUID], start_time: datetime, end_time: datetime,
+                  duration: timedelta, count: int, step: timedelta, day_start: time, day_end: time,
+                  weekdays: List[int], tz: tzinfo) -> List[Span]:
+    """
+    Return the first `count` slots of `duration` within [start_time, end_time)
+    when all the users are free, inside working hours in the given time zone.
+    
+    Candidate slots are swept in time order and checked against each user's
+    cached buckets by binary search. The user who blocked last is checked
+    first, and a blocked slot jumps past the busy span in its way, so a
+    search rarely looks at more than a few users per slot.
+    """
     from datetime import timezone
-    print(f"Checking conflicts for: {start_time} to {end_time}")
+    from ems.utils.intervals import find_free_slots, overlap_end, working_windows
+    
+    # Stored times are timezone-aware; treat naive input as UTC
+    if not start_time.tzinfo:
+        start_time = start_time.replace(tzinfo=timezone.utc)
+    if not end_time.tzinfo:
+        end_time = end_time.replace(tzinfo=timezone.utc)
+    
+    busy, buckets = _busy_by_bucket(db, user_ids, start_time, end_time)
+    size = timedelta(hours=settings.FREE_BUSY_BUCKET_HOURS)
+    order = list(busy.values())
+    
+    def busy_until(slot_start: datetime, slot_end: datetime) -> Optional[datetime]:
+        first_bucket = buckets[0] + (slot_start - buckets[0]) // size * size
+        for position, by_bucket in enumerate(order):
+            bucket = first_bucket
+            while bucket < slot_end:
+                until = overlap_end(by_bucket[bucket], slot_start, slot_end)
+                if until:
+                    order.insert(0, order.pop(position))
+                    return until
+                bucket += size
+        return None
     
-    # Convert start_time and end_time to UTC if they have timezone info
+    windows = working_windows(start_time, end_time, day_start, day_end, weekdays, tz, step)
+    return find_free_slots(windows, duration, step, count, busy_until)
+
+def invalidate_free_busy(owner_id) -> None:
+    """Forget the owner's cached busy time after their events changed."""
+    _free_busy_cache.invalidate(owner_id if isinstance(owner_id, uuid.UUID) else uuid.UUID(str(owner_id)))
+
+def intervals_overlap(start_time: datetime, end_time: datetime, event_start: datetime, event_end: datetime) -> bool:
+    """
+    Reference implementation of the conflict rules enforced by check_for_conflicts.
+    Kept in Python so the SQL predicate can be checked against it, as
+    benchmarks/conflict_rules.py does.
+    """
+    from datetime import timezone
+    
+    # Convert to UTC if they have timezone info
     if start_time.tzinfo:
         start_time = start_time.astimezone(timezone.utc)
     if end_time.tzinfo:
         end_time = end_time.astimezone(timezone.utc)
+    if event_start.tzinfo:
+        event_start = event_start.astimezone(timezone.utc)
+    if event_end.tzinfo:
+        event_end = event_end.astimezone(timezone.utc)
     
-    # Get all events for the owner
-    all_events = db.query(Event).filter(Event.owner_id == owner_id)
-    if event_id:
-        all_events = all_events.filter(Event.id != event_id)
+    # Case 1: New event starts during an existing event
+    if event_start <= start_time < event_end:
+        return True
     
-    all_events = all_events.all()
-    print(f"Found {len(all_events)} existing events for owner")
+    # Case 2: New event ends during an existing event
+    if event_start < end_time <= event_end:
+        return True
     
-    # Check each event for conflicts
-    conflicts = []
-    for event in all_events:
-        event_start = event.start_time
-        event_end = event.end_time
-        
-        # Convert to UTC if they have timezone info
-        if event_start.tzinfo:
-            event_start = event_start.astimezone(timezone.utc)
-        if event_end.tzinfo:
-            event_end = event_end.astimezone(timezone.utc)
-            
-        print(f"Comparing with event {event.id}: {event_start} to {event_end}")
-        
-        # Case 1: New event starts during an existing event
-        if event_start <= start_time < event_end:
-            print(f"Conflict: New event starts during existing event {event.id}")
-            conflicts.append(event)
-            continue
-            
-        # Case 2: New event ends during an existing event
-        if event_start < end_time <= event_end:
-            print(f"Conflict: New event ends during existing event {event.id}")
-            conflicts.append(event)
-            continue
-            
-        # Case 3: New event completely contains an existing event
-        if start_time <= event_start and end_time >= event_end:
-            print(f"Conflict: New event contains existing event {event.id}")
-            conflicts.append(event)
-            continue
-            
-        # Case 4: New event is completely contained within an existing event
-        if event_start <= start_time and event_end >= end_time:
-            print(f"Conflict: New event is contained within existing event {event.id}")
-            conflicts.append(event)
-            continue
-    
-    print(f"Found {len(conflicts)} conflicts")
-    return conflicts
+    # Case 3: New event completely contains an existing event
+    if start_time <= event_start and end_time >= event_end:
+        return True
+    
+    # Case 4: New event is completely contained within an existing event
+    if event_start <= start_time and event_end >= end_time:
+        return True
+    
+    return False
 
 def check_user_access(db: Session, event_id: str, user_id: str, permission_type: str = 'view') -> bool:
     """
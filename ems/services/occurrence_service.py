@@ -0,0 +1,188 @@
+# app/services/occurrence.py
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.orm import Session
+from sqlalchemy import or_, insert, delete, select, union_all, literal, null, cast
+import uuid
+
+from ems.core.config import settings
+from ems.models.event_model import Event
+from ems.models.occurrence_model import EventOccurrence
+from ems.utils.recurrence import iter_occurrences
+
+Interval = Tuple[uuid.UUID, datetime, datetime]
+
+def horizon_for(start_time: datetime) -> datetime:
+    """
+    Where a series starting at start_time stops being expanded ahead of time:
+    OCCURRENCE_HORIZON_DAYS past now, or past its start if that is later.
+    """
+    return max(datetime.now(timezone.utc), start_time) + timedelta(days=settings.OCCURRENCE_HORIZON_DAYS)
+
+def get_horizon(start_time: datetime, is_recurring: bool, recurrence_pattern: Optional[dict]) -> Optional[datetime]:
+    """
+    How far a series starting at start_time is materialized; occurrences
+    starting before this instant are kept in event_occurrences.
+    """
+    if not (settings.MATERIALIZE_OCCURRENCES and is_recurring and recurrence_pattern):
+        return None
+    return horizon_for(start_time)
+
+def set_horizon(event: Event) -> None:
+    """
+    Record the event's materialization horizon. Call before the event's own
+    write so bookkeeping doesn't cost a second UPDATE.
+    """
+    event.occurrences_until = get_horizon(event.start_time, event.is_recurring, event.recurrence_pattern)
+
+def materialize_occurrences(db: Session, events: List[Event]) -> None:
+    """
+    Insert the occurrences of recurring events up to their horizon with a
+    single statement. Does not remove existing rows or commit.
+    """
+    rows = []
+    for event in events:
+        if not event.occurrences_until:
+            continue
+        rows.extend(
+            {
+                "id": uuid.uuid4(),
+                "event_id": event.id,
+                "owner_id": event.owner_id,
+                "start_time": occ_start,
+                "end_time": occ_end,
+            }
+            for occ_start, occ_end in iter_occurrences(
+                event.start_time, event.end_time, event.recurrence_pattern, window_end=event.occurrences_until
+            )
+            if occ_start != event.start_time
+        )
+    
+    if rows:
+        db.execute(insert(EventOccurrence), rows)
+
+def refresh_occurrences(db: Session, event: Event) -> None:
+    """
+    Rebuild the materialized occurrences of a single event after set_horizon
+    and the event's write. Called whenever an event's schedule changes, as
+    part of the caller's transaction; the caller commits.
+    """
+    db.execute(delete(EventOccurrence).where(EventOccurrence.event_id == event.id))
+    materialize_occurrences(db, [event])
+
+def get_occurrences(db: Session, start_date: datetime, end_date: datetime,
+                    owner_id: Optional[uuid.UUID] = None,
+                    exclude_event_id: Optional[str] = None) -> List[Interval]:
+    """
+    Return (event_id, start, end) for every occurrence after the first one
+    of a recurring event that overlaps [start_date, end_date).
+
+    Materialized rows are read through their index; only the part of a
+    series past its materialization horizon is expanded on the fly.
+    """
+    query = db.query(
+        EventOccurrence.event_id, EventOccurrence.start_time, EventOccurrence.end_time
+    ).filter(
+        EventOccurrence.start_time < end_date,
+        EventOccurrence.end_time > start_date
+    )
+    if owner_id:
+        query = query.filter(EventOccurrence.owner_id == owner_id)
+    if exclude_event_id:
+        query = query.filter(EventOccurrence.event_id != exclude_event_id)
+    occurrences = [(row.event_id, row.start_time, row.end_time) for row in query.all()]
+
+    # Series (or parts of them) that were never materialized
+    tail_query = db.query(Event).filter(
+        Event.is_recurring.is_(True),
+        Event.start_time < end_date,
+        or_(Event.occurrences_until.is_(None), Event.occurrences_until < end_date)
+    )
+    if owner_id:
+        tail_query = tail_query.filter(Event.owner_id == owner_id)
+    if exclude_event_id:
+        tail_query = tail_query.filter(Event.id != exclude_event_id)
+
+    for event in tail_query.all():
+        for occ_start, occ_end in iter_occurrences(
+            event.start_time, event.end_time, event.recurrence_pattern, start_date, end_date
+        ):
+            if occ_start == event.start_time:
+                continue
+            if event.occurrences_until and occ_start < event.occurrences_until:
+                continue
+            occurrences.append((event.id, occ_start, occ_end))
+
+    return occurrences
+
+def get_busy_intervals(db: Session, start_date: datetime, end_date: datetime,
+                       owner_id: Optional[uuid.UUID] = None,
+                       exclude_event_id: Optional[str] = None) -> List[Interval]:
+    """
+    Return (event_id, start, end) for every event instance overlapping
+    [start_date, end_date), recurring or not, sorted by start time.
+    """
+    query = db.query(Event.id, Event.start_time, Event.end_time).filter(
+        Event.start_time < end_date,
+        Event.end_time > start_date
+    )
+    if owner_id:
+        query = query.filter(Event.owner_id == owner_id)
+    if exclude_event_id:
+        query = query.filter(Event.id != exclude_event_id)
+
+    intervals = [(row.id, row.start_time, row.end_time) for row in query.all()]
+    intervals.extend(get_occurrences(db, start_date, end_date, owner_id, exclude_event_id))
+    intervals.sort(key=lambda interval: interval[1])
+    return intervals
+
+def get_busy_spans(db: Session, owner_ids: Iterable[uuid.UUID], start_date: datetime,
+                   end_date: datetime) -> Dict[uuid.UUID, List[Tuple[datetime, datetime]]]:
+    """
+    Return the (start, end) of every instance of each owner's events that
+    overlaps [start_date, end_date), unsorted, keyed by owner.
+    
+    Events, materialized occurrences and series running past their horizon
+    are read by one UNION ALL query over all owners; only those series are
+    expanded here, as get_occurrences does for a single owner.
+    """
+    owner_ids = list(owner_ids)
+    no_pattern = (
+        cast(null(), Event.recurrence_pattern.type).label("recurrence_pattern"),
+        cast(null(), Event.occurrences_until.type).label("occurrences_until"),
+    )
+    events = select(
+        Event.owner_id, Event.start_time, Event.end_time, literal(False).label("expand"), *no_pattern
+    ).where(Event.owner_id.in_(owner_ids), Event.start_time < end_date, Event.end_time > start_date)
+    occurrences = select(
+        EventOccurrence.owner_id, EventOccurrence.start_time, EventOccurrence.end_time,
+        literal(False).label("expand"), *no_pattern
+    ).where(
+        EventOccurrence.owner_id.in_(owner_ids),
+        EventOccurrence.start_time < end_date,
+        EventOccurrence.end_time > start_date
+    )
+    tails = select(
+        Event.owner_id, Event.start_time, Event.end_time, literal(True).label("expand"),
+        Event.recurrence_pattern, Event.occurrences_until
+    ).where(
+        Event.owner_id.in_(owner_ids),
+        Event.is_recurring.is_(True),
+        Event.start_time < end_date,
+        or_(Event.occurrences_until.is_(None), Event.occurrences_until < end_date)
+    )
+    
+    spans: Dict[uuid.UUID, List[Tuple[datetime, datetime]]] = {owner_id: [] for owner_id in owner_ids}
+    for row in db.execute(union_all(events, occurrences, tails)):
+        if not row.expand:
+            spans[row.owner_id].append((row.start_time, row.end_time))
+            continue
+        for occ_start, occ_end in iter_occurrences(
+            row.start_time, row.end_time, row.recurrence_pattern, start_date, end_date
+        ):
+            if occ_start == row.start_time:
+                continue
+            if row.occurrences_until and occ_start < row.occurrences_until:
+                continue
+            spans[row.owner_id].append((occ_start, occ_end))
+    return spans
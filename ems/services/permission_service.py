@@ -1,11 +1,201 @@
 # app/services/permission.py
-from typing import List, Optional
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import Row, and_, delete, func, select, true, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+import uuid
 
+from ems.core.config import settings
+from ems.models.event_model import Event
 from ems.models.permission_model import EventPermission
 from ems.models.user_model import User
+from ems.models.visibility_model import EventVisibility
 from ems.schemas.permission_schema import PermissionCreate, PermissionUpdate
+from ems.utils.cache import TTLCache
+from ems.utils.pagination import paginate
+from ems.utils.recurrence import series_end
+
+# What each role may do; owners of an event have every capability
+ROLE_CAPABILITIES = {
+    'owner': {'view', 'edit', 'delete', 'share'},
+    'editor': {'view', 'edit'},
+    'viewer': {'view'},
+}
+
+class EventAccess(NamedTuple):
+    event_id: uuid.UUID
+    owner_id: uuid.UUID
+    role: Optional[str]  # The caller's effective role, None if they have no access
+    
+    def allows(self, permission_type: str) -> bool:
+        return permission_type in ROLE_CAPABILITIES.get(self.role, ())
+
+# event_id -> {user_id: (owner_id, effective role)}; invalidated per event on any change
+_role_cache: TTLCache[Dict[uuid.UUID, Tuple[uuid.UUID, Optional[str]]]] = TTLCache(
+    settings.ROLE_CACHE_SIZE, settings.ROLE_CACHE_TTL_SECONDS
+)
+
+def _as_uuid(value) -> uuid.UUID:
+    return value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+
+def _cache_role(event_id: uuid.UUID, user_id: uuid.UUID, owner_id: uuid.UUID, role: Optional[str]) -> None:
+    roles = _role_cache.get(event_id)
+    if roles is None:
+        roles = {}
+        _role_cache.set(event_id, roles)
+    roles[user_id] = (owner_id, role)
+
+def invalidate_event_roles(event_id) -> None:
+    _role_cache.invalidate(_as_uuid(event_id))
+
+def get_event_and_role(db: Session, event_id, user_id) -> Tuple[Optional[Event], Optional[str]]:
+    """
+    Fetch an event and the user's effective role on it with one LEFT JOIN.
+    The role is 'owner' for the event's owner and None without a grant.
+    """
+    try:
+        event_id, user_id = _as_uuid(event_id), _as_uuid(user_id)
+    except ValueError:
+        return None, None
+    
+    row = db.query(Event, EventPermission.role).outerjoin(
+        EventPermission,
+        and_(
+            EventPermission.event_id == Event.id,
+            EventPermission.user_id == user_id
+        )
+    ).filter(Event.id == event_id).first()
+    if not row:
+        return None, None
+    
+    event, role = row
+    if event.owner_id == user_id:
+        role = 'owner'
+    _cache_role(event_id, user_id, event.owner_id, role)
+    return event, role
+
+def get_event_access(db: Session, event_id, user_id) -> Optional[EventAccess]:
+    """
+    The user's access to an event, or None if the event doesn't exist.
+    Served from the role cache when possible, otherwise by get_event_and_role.
+    """
+    try:
+        event_id, user_id = _as_uuid(event_id), _as_uuid(user_id)
+    except ValueError:
+        return None
+    
+    roles = _role_cache.get(event_id)
+    if roles is not None and user_id in roles:
+        owner_id, role = roles[user_id]
+        return EventAccess(event_id, owner_id, role)
+    
+    event, role = get_event_and_role(db, event_id, user_id)
+    if not event:
+        return None
+    return EventAccess(event.id, event.owner_id, role)
+
+def get_event_roles(db: Session, event_ids: Iterable[uuid.UUID], user_id) -> Dict[uuid.UUID, Optional[str]]:
+    """
+    get_event_and_role for many events in one query: the user's effective
+    role on each event that exists. Missing events are left out.
+    """
+    user_id = _as_uuid(user_id)
+    rows = db.query(Event.id, Event.owner_id, EventPermission.role).outerjoin(
+        EventPermission,
+        and_(
+            EventPermission.event_id == Event.id,
+            EventPermission.user_id == user_id
+        )
+    ).filter(Event.id.in_(set(event_ids))).all()
+    
+    roles = {}
+    for event_id, owner_id, role in rows:
+        if owner_id == user_id:
+            role = 'owner'
+        _cache_role(event_id, user_id, owner_id, role)
+        roles[event_id] = role
+    return roles
+
+def share_events(db: Session, event_ids: List[uuid.UUID], grants: Dict[uuid.UUID, str],
+                 granted_by_id) -> List[EventPermission]:
+    """
+    Give every user in grants their role on every event, with a single
+    INSERT ... ON CONFLICT (event_id, user_id) DO UPDATE. Existing grants
+    get the new role; grant time and grantor stay as they were. Commits once.
+    """
+    if not event_ids or not grants:
+        return []
+    
+    stmt = insert(EventPermission)
+    stmt = stmt.on_conflict_do_update(
+        constraint='event_user_uc', set_={"role": stmt.excluded.role}
+    ).returning(EventPermission)
+    rows = [
+        {"event_id": event_id, "user_id": user_id, "role": role, "granted_by_id": granted_by_id}
+        for event_id in event_ids
+        for user_id, role in grants.items()
+    ]
+    permissions = db.scalars(stmt, rows, execution_options={"populate_existing": True}).all()
+    add_visibility(db, event_ids, grants)
+    db.commit()
+    for event_id in event_ids:
+        invalidate_event_roles(event_id)
+    return permissions
+
+def _span_end(event) -> Optional[datetime]:
+    return series_end(event.start_time, event.end_time, event.recurrence_pattern if event.is_recurring else None)
+
+def _visibility_row(user_id: uuid.UUID, event) -> Dict:
+    return {"user_id": user_id, "event_id": event.id, "start_time": event.start_time, "span_end": _span_end(event)}
+
+def add_visibility(db: Session, event_ids: Iterable, user_ids: Iterable) -> None:
+    """
+    Record that the users can see the events, for the shared-events feed.
+    Owners are left out. Part of the caller's transaction.
+    """
+    user_ids = [_as_uuid(user_id) for user_id in user_ids]
+    events = db.query(
+        Event.id, Event.owner_id, Event.start_time, Event.end_time, Event.is_recurring, Event.recurrence_pattern
+    ).filter(Event.id.in_({_as_uuid(event_id) for event_id in event_ids})).all()
+    rows = [
+        _visibility_row(user_id, event)
+        for event in events
+        for user_id in user_ids
+        if user_id != event.owner_id
+    ]
+    if rows:
+        stmt = insert(EventVisibility).on_conflict_do_nothing(
+            index_elements=[EventVisibility.user_id, EventVisibility.event_id]
+        )
+        db.execute(stmt, rows)
+
+def sync_visibility(db: Session, event: Event) -> None:
+    """Carry a schedule change over to the event's visibility rows; the caller commits."""
+    db.execute(
+        update(EventVisibility)
+        .where(EventVisibility.event_id == event.id)
+        .values(start_time=event.start_time, span_end=_span_end(event))
+    )
+
+def rebuild_visibility(db: Session, batch_size: int = 5000) -> int:
+    """Recreate every visibility row from event_permissions and commit. Returns the row count."""
+    db.execute(delete(EventVisibility))
+    result = db.execute(
+        select(
+            EventPermission.user_id, Event.id, Event.owner_id, Event.start_time,
+            Event.end_time, Event.is_recurring, Event.recurrence_pattern
+        )
+        .join(Event, Event.id == EventPermission.event_id)
+        .where(EventPermission.user_id != Event.owner_id)
+        .execution_options(yield_per=batch_size)
+    )
+    count = 0
+    for partition in result.partitions():
+        db.execute(insert(EventVisibility), [_visibility_row(row.user_id, row) for row in partition])
+        count += len(partition)
+    db.commit()
+    return count
 
 def get_permission(db: Session, event_id: str, user_id: str) -> Optional[EventPermission]:
     return db.query(EventPermission).filter(
@@ -18,6 +208,37 @@ def get_permission(db: Session, event_id: str, user_id: str) -> Optional[EventPe
 def get_permissions_by_event(db: Session, event_id: str) -> List[EventPermission]:
     return db.query(EventPermission).filter(EventPermission.event_id == event_id).all()
 
+def get_permission_page(db: Session, event_id, after: Optional[Tuple[datetime, uuid.UUID]] = None,
+                        limit: int = 100, role: Optional[str] = None) -> Tuple[List[Row], Optional[str]]:
+    """
+    Return a page of the event's permissions in grant order, starting after
+    the given (granted_at, id) keyset position, with the cursor for the next
+    page. Usernames are joined in and the can_* flags computed in SQL, so the
+    rows validate directly as the Permission schema.
+    """
+    query = select(
+        EventPermission.id,
+        EventPermission.event_id,
+        EventPermission.user_id,
+        EventPermission.role,
+        EventPermission.granted_at,
+        EventPermission.granted_by_id,
+        true().label("can_view"),
+        EventPermission.role.in_(['editor', 'owner']).label("can_edit"),
+        (EventPermission.role == 'owner').label("can_delete"),
+        (EventPermission.role == 'owner').label("can_share"),
+        func.coalesce(User.username, "Unknown").label("username")
+    ).outerjoin(User, User.id == EventPermission.user_id).where(EventPermission.event_id == event_id)
+    
+    if role:
+        query = query.where(EventPermission.role == role)
+    if after:
+        query = query.where(tuple_(EventPermission.granted_at, EventPermission.id) > tuple_(*after))
+    
+    query = query.order_by(EventPermission.granted_at, EventPermission.id).limit(limit + 1)
+    rows = db.execute(query).all()
+    return paginate(rows, limit, key=lambda row: (row.granted_at, row.id))
+
 def create_permission(db: Session, permission_in: PermissionCreate, event_id: str, granted_by_id: str) -> EventPermission:
     db_obj = EventPermission(
         event_id=event_id,
@@ -26,8 +247,10 @@ def create_permission(db: Session, permission_in: PermissionCreate, event_id: st
         granted_by_id=granted_by_id
     )
     db.add(db_obj)
+    add_visibility(db, [event_id], [permission_in.user_id])
     db.commit()
     db.refresh(db_obj)
+    invalidate_event_roles(event_id)
     return db_obj
 
 def update_permission(db: Session, db_obj: EventPermission, permission_in: PermissionUpdate) -> EventPermission:
@@ -35,10 +258,16 @@ def update_permission(db: Session, db_obj: EventPermission, permission_in: Permi
     db.add(db_obj)
     db.commit()
     db.refresh(db_obj)
+    invalidate_event_roles(db_obj.event_id)
     return db_obj
 def delete_permission(db: Session, db_obj: EventPermission) -> None:
+    event_id = db_obj.event_id
+    db.execute(delete(EventVisibility).where(
+        EventVisibility.event_id == event_id, EventVisibility.user_id == db_obj.user_id
+    ))
     db.delete(db_obj)
     db.commit()
+    invalidate_event_roles(event_id)
 
 def check_permission(db: Session, event_id: str, user_id: str, permission_type: str) -> bool:
     """
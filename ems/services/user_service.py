@@ -1,28 +1,90 @@
 # app/services/user.py
 import uuid
-from typing import Optional
+from typing import Dict, Iterable, Optional
 from datetime import datetime
 
-from sqlalchemy.orm import Session
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session, make_transient_to_detached
 
+from ems.core.config import settings
 from ems.models.user_model import User
+from ems.utils.cache import TTLCache
 from ems.utils.auth import get_password_hash, verify_password
 from ems.schemas.user_schema import UserCreate, UserUpdate
 
+def normalize_email(email: str) -> str:
+    """Emails are stored lower-cased, so each address belongs to one account whatever its case."""
+    return email.strip().lower()
+
 def get_by_email(db: Session, email: str) -> Optional[User]:
-    return db.query(User).filter(User.email == email).first()
+    return db.query(User).filter(func.lower(User.email) == normalize_email(email)).first()
 
 def get_by_username(db: Session, username: str) -> Optional[User]:
     return db.query(User).filter(User.username == username).first()
 
+def get_by_login(db: Session, username_or_email: str) -> Optional[User]:
+    """
+    Find the user a login names, by username or by email, with one query.
+    Surrounding whitespace is ignored and emails match in any case. If the
+    input is one user's username and another's email, the email wins.
+    """
+    login = username_or_email.strip()
+    email_matches = func.lower(User.email) == normalize_email(login)
+    return db.query(User).filter(
+        or_(User.username == login, email_matches)
+    ).order_by(email_matches.desc()).first()
+
+# Recently loaded users, shared by requests in this process
+_user_cache: TTLCache[User] = TTLCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL_SECONDS)
+
 def get_by_id(db: Session, user_id: uuid.UUID) -> Optional[User]:
-    return db.query(User).filter(User.id == user_id).first()
+    """
+    Load a user by id, at most once per session (i.e. per request).
+    Session.get() answers repeat lookups from the identity map; a first
+    lookup is served from the short-TTL process cache when possible.
+    """
+    try:
+        user_id = user_id if isinstance(user_id, uuid.UUID) else uuid.UUID(str(user_id))
+    except ValueError:
+        return None
+    
+    cached = _user_cache.get(user_id)
+    if cached is not None:
+        # Attach a copy to this session without a round-trip
+        return db.merge(cached, load=False)
+    
+    user = db.get(User, user_id)
+    if user:
+        _user_cache.set(user_id, _detached_copy(user))
+    return user
+
+def _detached_copy(user: User) -> User:
+    """A copy of the loaded row that belongs to no session, safe to share."""
+    copy = User(**{column.key: getattr(user, column.key) for column in User.__table__.columns})
+    make_transient_to_detached(copy)
+    return copy
+
+def get_usernames(db: Session, user_ids: Iterable) -> Dict[uuid.UUID, str]:
+    """Usernames of the given users that exist, with one IN query; invalid ids are skipped."""
+    ids = set()
+    for user_id in user_ids:
+        try:
+            ids.add(user_id if isinstance(user_id, uuid.UUID) else uuid.UUID(str(user_id)))
+        except ValueError:
+            continue
+    if not ids:
+        return {}
+    return dict(db.query(User.id, User.username).filter(User.id.in_(ids)).all())
+
+def invalidate_cached_user(user_id: uuid.UUID) -> None:
+    _user_cache.invalidate(user_id)
 
-def create(db: Session, *, obj_in: UserCreate) -> User:
+def create(db: Session, *, obj_in: UserCreate, hashed_password: Optional[str] = None) -> User:
+    """Create the user; pass hashed_password when the password was already hashed off the event loop."""
     db_obj = User(
         username=obj_in.username,
-        email=obj_in.email,
-        hashed_password=get_password_hash(obj_in.password),
+        email=normalize_email(obj_in.email),
+        hashed_password=hashed_password or get_password_hash(obj_in.password),
         is_active=True,
     )
     db.add(db_obj)
@@ -37,6 +99,8 @@ def update(db: Session, *, db_obj: User, obj_in: UserUpdate) -> User:
         hashed_password = get_password_hash(update_data["password"])
         del update_data["password"]
         update_data["hashed_password"] = hashed_password
+    if update_data.get("email"):
+        update_data["email"] = normalize_email(update_data["email"])
     
     for field, value in update_data.items():
         setattr(db_obj, field, value)
@@ -44,10 +108,11 @@ def update(db: Session, *, db_obj: User, obj_in: UserUpdate) -> User:
     db.add(db_obj)
     db.commit()
     db.refresh(db_obj)
+    invalidate_cached_user(db_obj.id)
     return db_obj
 
 def authenticate(db: Session, *, username_or_email: str, password: str) -> Optional[User]:
-    user = get_by_email(db, username_or_email) or get_by_username(db, username_or_email)
+    user = get_by_login(db, username_or_email)
     if not user:
         return None
     if not verify_password(password, user.hashed_password):
@@ -57,6 +122,7 @@ def authenticate(db: Session, *, username_or_email: str, password: str) -> Optio
 def update_last_login(db: Session, *, user: User) -> User:
     user.last_login = datetime.now()
     db.add(user)
+    # The value just written stays loaded; no need to read it back
     db.commit()
-    db.refresh(user)
+    invalidate_cached_user(user.id)
     return user
\ No newline at end of file
@@ -1,41 +1,124 @@
 # app/services/version.py
-from typing import List, Optional, Dict, Any
+import copy
+from typing import List, Optional, Dict, Any, Iterable, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import Row, and_, desc, func, insert, select, tuple_, update
 import uuid
 from datetime import datetime
 
+from ems.core.config import settings
 from ems.models.event_model import Event
+from ems.models.user_model import User
 from ems.models.version_model import EventVersion, EventChangelog
 from ems.schemas.version_schema import EventVersionCreate, ChangelogCreate
 from ems.services import event_service
 from ems.services import user_service
+from ems.utils.cache import TTLCache
+from ems.utils.pagination import paginate
+
+# (event_id, version_number) -> full snapshot; versions never change once written
+_version_cache: TTLCache[Dict[str, Any]] = TTLCache(settings.VERSION_CACHE_SIZE, float("inf"))
+# (event_id, low, high) -> composed diff and blame; history is append-only
+_diff_cache: TTLCache[Dict[str, Any]] = TTLCache(settings.DIFF_CACHE_SIZE, float("inf"))
+
+def is_keyframe_number(version_number: int, interval: Optional[int] = None) -> bool:
+    """Versions 1, K+1, 2K+1, ... are stored as full snapshots."""
+    interval = interval or settings.VERSION_KEYFRAME_INTERVAL
+    return (version_number - 1) % interval == 0
+
+def make_delta(old_data: Dict[str, Any], new_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Fields of new_data that differ from old_data, with their new values."""
+    return {
+        key: value for key, value in new_data.items()
+        if key not in old_data or old_data[key] != value
+    }
+
+def apply_delta(data: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    result = dict(data)
+    result.update(delta)
+    return result
+
+def _replay(db: Session, event_id: Any, version_number: int) -> Optional[Dict[str, Any]]:
+    """
+    Rebuild a version from the nearest keyframe at or below it, reading at
+    most VERSION_KEYFRAME_INTERVAL rows. Every version passed is cached.
+    """
+    keyframe = select(func.max(EventVersion.version_number)).where(
+        EventVersion.event_id == event_id,
+        EventVersion.is_keyframe.is_(True),
+        EventVersion.version_number <= version_number
+    ).scalar_subquery()
+    rows = db.execute(
+        select(EventVersion.version_number, EventVersion.data, EventVersion.is_keyframe)
+        .where(
+            EventVersion.event_id == event_id,
+            EventVersion.version_number <= version_number,
+            EventVersion.version_number >= func.coalesce(keyframe, 0)
+        )
+        .order_by(EventVersion.version_number)
+    ).all()
+    
+    data = None
+    for row in rows:
+        data = row.data if row.is_keyframe or data is None else apply_delta(data, row.data)
+        _version_cache.set((str(event_id), row.version_number), data)
+    if not rows or rows[-1].version_number != version_number:
+        return None
+    return data
+
+def _materialize(db: Session, version: Optional[EventVersion]) -> Optional[EventVersion]:
+    """
+    Replace a delta row's data with the full snapshot, in memory only, so
+    callers always see complete event data whatever the storage mode.
+    """
+    if version is None:
+        return None
+    key = (str(version.event_id), version.version_number)
+    data = _version_cache.get(key)
+    if data is None:
+        previous = _version_cache.get((key[0], version.version_number - 1))
+        if version.is_keyframe:
+            data = version.data
+        elif previous is not None:
+            data = apply_delta(previous, version.data)
+        else:
+            data = _replay(db, version.event_id, version.version_number)
+        _version_cache.set(key, data)
+    set_committed_value(version, "data", copy.deepcopy(data))
+    return version
 
 def get_version_by_number(db: Session, event_id: str, version_number: int) -> Optional[EventVersion]:
-    return db.query(EventVersion).filter(
+    version = db.query(EventVersion).filter(
         and_(
             EventVersion.event_id == event_id,
             EventVersion.version_number == version_number
         )
     ).first()
+    return _materialize(db, version)
 
 def get_latest_version(db: Session, event_id: str) -> Optional[EventVersion]:
-    return db.query(EventVersion).filter(
+    version = db.query(EventVersion).filter(
         EventVersion.event_id == event_id
     ).order_by(desc(EventVersion.version_number)).first()
+    return _materialize(db, version)
 
 def get_all_versions(db: Session, event_id: str) -> List[EventVersion]:
-    return db.query(EventVersion).filter(
+    versions = db.query(EventVersion).filter(
         EventVersion.event_id == event_id
-    ).order_by(desc(EventVersion.version_number)).all()
-
-def create_version(db: Session, event: Event, user_id: str, description: Optional[str] = None) -> EventVersion:
-    # Get the latest version number and increment
-    latest_version = get_latest_version(db, str(event.id))
-    version_number = 1 if not latest_version else latest_version.version_number + 1
+    ).order_by(EventVersion.version_number).all()
     
-    # Create the event data to store
-    event_data = {
+    # One pass from the first version rebuilds every delta in order. A row
+    # already materialized holds a full snapshot, which applies the same way.
+    data = None
+    for version in versions:
+        data = version.data if version.is_keyframe or data is None else apply_delta(data, version.data)
+        set_committed_value(version, "data", copy.deepcopy(data))
+    return versions[::-1]
+
+def event_to_dict(event: Event) -> Dict[str, Any]:
+    """Snapshot of an event as stored in EventVersion.data."""
+    return {
         "id": str(event.id),
         "title": event.title,
         "description": event.description,
@@ -49,29 +132,110 @@ def create_version(db: Session, event: Event, user_id: str, description: Optiona
         "updated_at": event.updated_at.isoformat() if event.updated_at else None,
         "current_version": event.current_version
     }
+
+def create_version(db: Session, event: Event, user_id: str, description: Optional[str] = None,
+                   previous_data: Optional[Dict[str, Any]] = None) -> EventVersion:
+    """
+    Stage a version holding the event as flushed, numbered event.current_version.
+    previous_data is the snapshot of the version before it, which the delta
+    is taken against; without it a full snapshot is stored. The caller commits.
+    """
+    version_number = event.current_version
+    event_data = event_to_dict(event)
+    is_keyframe = previous_data is None or is_keyframe_number(version_number)
     
     # Create the version
     db_obj = EventVersion(
         event_id=event.id,
         version_number=version_number,
-        data=event_data,
+        data=event_data if is_keyframe else make_delta(previous_data, event_data),
+        is_keyframe=is_keyframe,
         created_by_id=user_id,
         change_description=description
     )
     db.add(db_obj)
-    db.commit()
-    db.refresh(db_obj)
+    return db_obj
+
+def create_initial_versions(db: Session, events: List[Event], user_id: str) -> None:
+    """
+    Write version 1 and the 'create' changelog entry for newly inserted events,
+    one multi-row INSERT each. The caller commits.
+    """
+    if not events:
+        return
     
-    # Update the event's current_version
-    event.current_version = version_number
-    db.add(event)
-    db.commit()
+    db.execute(insert(EventVersion), [
+        {
+            "id": uuid.uuid4(),
+            "event_id": event.id,
+            "version_number": 1,
+            "data": event_to_dict(event),
+            "is_keyframe": True,
+            "created_by_id": user_id,
+            "change_description": "Initial version",
+        }
+        for event in events
+    ])
+    db.execute(insert(EventChangelog), [
+        {
+            "id": uuid.uuid4(),
+            "event_id": event.id,
+            "user_id": user_id,
+            "action": "create",
+            "version_from": None,
+            "version_to": 1,
+            "changes": None,
+        }
+        for event in events
+    ])
+
+def compact_versions(db: Session, interval: Optional[int] = None,
+                     event_ids: Optional[Iterable[Any]] = None, batch_size: int = 100) -> int:
+    """
+    Rewrite stored history so every event has a keyframe each `interval`
+    versions and deltas in between; interval=1 expands back to full
+    snapshots. Reconstructed versions are unchanged, so cached ones stay
+    valid. Commits once per batch of events and returns the rows rewritten.
+    """
+    interval = interval or settings.VERSION_KEYFRAME_INTERVAL
+    if event_ids is None:
+        event_ids = db.scalars(select(EventVersion.event_id).distinct()).all()
+    event_ids = list(event_ids)
     
-    return db_obj
+    rewritten = 0
+    for i in range(0, len(event_ids), batch_size):
+        batch = event_ids[i:i + batch_size]
+        rows = db.execute(
+            select(EventVersion.id, EventVersion.event_id, EventVersion.version_number,
+                   EventVersion.data, EventVersion.is_keyframe)
+            .where(EventVersion.event_id.in_(batch))
+            .order_by(EventVersion.event_id, EventVersion.version_number)
+        ).all()
+        
+        updates = []
+        current_event, data = None, None
+        for row in rows:
+            if row.event_id != current_event:
+                current_event, previous = row.event_id, None
+            else:
+                previous = data
+            data = row.data if row.is_keyframe or previous is None else apply_delta(previous, row.data)
+            
+            keyframe = previous is None or is_keyframe_number(row.version_number, interval)
+            stored = data if keyframe else make_delta(previous, data)
+            if keyframe != row.is_keyframe or stored != row.data:
+                updates.append({"id": row.id, "data": stored, "is_keyframe": keyframe})
+        
+        if updates:
+            db.execute(update(EventVersion), updates)
+            rewritten += len(updates)
+        db.commit()
+    return rewritten
 
 def create_changelog(db: Session, event_id: str, user_id: str, action: str, 
                     version_from: Optional[int] = None, version_to: Optional[int] = None, 
                     changes: Optional[Dict[str, Any]] = None) -> EventChangelog:
+    """Stage a changelog entry; the caller commits."""
     db_obj = EventChangelog(
         event_id=event_id,
         user_id=user_id,
@@ -81,14 +245,41 @@ def create_changelog(db: Session, event_id: str, user_id: str, action: str,
         changes=changes
     )
     db.add(db_obj)
-    db.commit()
-    db.refresh(db_obj)
     return db_obj
 
-def get_changelogs(db: Session, event_id: str) -> List[EventChangelog]:
-    return db.query(EventChangelog).filter(
-        EventChangelog.event_id == event_id
-    ).order_by(desc(EventChangelog.timestamp)).all()
+def get_changelogs(db: Session, event_id: str, after: Optional[Tuple[datetime, uuid.UUID]] = None,
+                   limit: int = 100, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                   action: Optional[str] = None) -> Tuple[List[Row], Optional[str]]:
+    """
+    Return a newest-first page of the event's changelog, usernames joined in,
+    starting after the given (timestamp, id) keyset position, together with
+    the cursor for the next page. since (inclusive) and until (exclusive)
+    bound the timestamp and action picks one kind of entry.
+    """
+    query = select(
+        EventChangelog.id,
+        EventChangelog.event_id,
+        EventChangelog.user_id,
+        EventChangelog.timestamp,
+        EventChangelog.action,
+        EventChangelog.version_from,
+        EventChangelog.version_to,
+        EventChangelog.changes,
+        func.coalesce(User.username, "Unknown").label("username")
+    ).outerjoin(User, User.id == EventChangelog.user_id).where(EventChangelog.event_id == event_id)
+    
+    if since:
+        query = query.where(EventChangelog.timestamp >= since)
+    if until:
+        query = query.where(EventChangelog.timestamp < until)
+    if action:
+        query = query.where(EventChangelog.action == action)
+    if after:
+        query = query.where(tuple_(EventChangelog.timestamp, EventChangelog.id) < tuple_(*after))
+    
+    query = query.order_by(desc(EventChangelog.timestamp), desc(EventChangelog.id)).limit(limit + 1)
+    rows = db.execute(query).all()
+    return paginate(rows, limit, key=lambda row: (row.timestamp, row.id))
 
 def generate_diff(old_data: Dict[str, Any], new_data: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -116,7 +307,77 @@ def generate_diff(old_data: Dict[str, Any], new_data: Dict[str, Any]) -> Dict[st
     
     return diff
 
+def compose_diff(db: Session, event_id: str, version1: int, version2: int) -> Optional[Dict[str, Any]]:
+    """
+    Diff between two versions of an event, however far apart, as
+    {"diff": ..., "blame": ...}, or None if either version doesn't exist.
+
+    The diff is composed from the changelog entries between the two versions
+    in one indexed range scan, without loading any snapshot. "blame" gives,
+    for each field in the diff, the last version in the range that changed
+    it and who made that change. When the changelog doesn't cover the whole
+    range, the two versions are reconstructed and compared instead, and
+    blame is None.
+    """
+    key = (str(event_id), version1, version2)
+    cached = _diff_cache.get(key)
+    if cached is not None:
+        return cached
+    
+    low, high = min(version1, version2), max(version1, version2)
+    entries = db.execute(
+        select(
+            EventChangelog.version_from, EventChangelog.version_to, EventChangelog.changes,
+            EventChangelog.user_id, EventChangelog.timestamp, User.username
+        )
+        .outerjoin(User, User.id == EventChangelog.user_id)
+        .where(
+            EventChangelog.event_id == event_id,
+            EventChangelog.version_to > low,
+            EventChangelog.version_to <= high
+        )
+        .order_by(EventChangelog.version_to)
+    ).all()
+    
+    contiguous = len(entries) == high - low and all(
+        entry.version_from == low + i and entry.version_to == low + i + 1
+        for i, entry in enumerate(entries)
+    )
+    if contiguous and entries:
+        diff: Dict[str, Any] = {}
+        blame: Dict[str, Any] = {}
+        for entry in entries:
+            for field, change in (entry.changes or {}).items():
+                # Keep the value before the first change and after the last one
+                diff[field] = {"old": diff[field]["old"] if field in diff else change.get("old"), "new": change.get("new")}
+                blame[field] = {
+                    "version": entry.version_to,
+                    "user_id": str(entry.user_id) if entry.user_id else None,
+                    "username": entry.username or "Unknown",
+                    "timestamp": entry.timestamp,
+                }
+        # A field changed and then changed back is not part of the diff
+        diff = {field: change for field, change in diff.items() if change["old"] != change["new"]}
+        blame = {field: blame[field] for field in diff}
+        if version1 > version2:
+            diff = {field: {"old": change["new"], "new": change["old"]} for field, change in diff.items()}
+        result = {"diff": diff, "blame": blame}
+    else:
+        old_version = get_version_by_number(db, event_id, version1)
+        new_version = get_version_by_number(db, event_id, version2)
+        if not old_version or not new_version:
+            return None
+        result = {"diff": generate_diff(old_version.data, new_version.data), "blame": None}
+    
+    _diff_cache.set(key, result)
+    return result
+
 def rollback_event(db: Session, event_id: str, version_number: int, user_id: str) -> Event:
+    """
+    Restore the event to an earlier version, writing the event, the new
+    version, the changelog entry and its occurrences in one transaction.
+    Re-applied if a concurrent edit wins the race.
+    """
     # Get the specified version
     version = get_version_by_number(db, event_id, version_number)
     if not version:
@@ -127,11 +388,19 @@ def rollback_event(db: Session, event_id: str, version_number: int, user_id: str
     if not event:
         return None
     
-    # Get the current version data for changelog
-    current_version = get_latest_version(db, event_id)
+    # A retry's rollback expires the row, which only holds a delta
+    version_data = version.data
+    return event_service.retry_on_stale(
+        db, lambda: _rollback(db, event, version_number, version_data, user_id)
+    )
+
+def _rollback(db: Session, event: Event, version_number: int,
+              version_data: Dict[str, Any], user_id: str) -> Event:
+    # The loaded event is the latest version, for the delta and changelog
+    current_data = event_to_dict(event)
+    current_version = event.current_version
     
     # Apply the version data to the event
-    version_data = version.data
     event.title = version_data.get('title', event.title)
     event.description = version_data.get('description', event.description)
     
@@ -145,31 +414,39 @@ def rollback_event(db: Session, event_id: str, version_number: int, user_id: str
     event.is_recurring = version_data.get('is_recurring', event.is_recurring)
     event.recurrence_pattern = version_data.get('recurrence_pattern', event.recurrence_pattern)
     
-    # Update the event with the rolled back data
-    event.updated_at = datetime.now()
+    # The restored schedule may differ from the current one
+    from ems.services import occurrence_service, permission_service
+    occurrence_service.set_horizon(event)
+    
+    # Update the event with the rolled back data; updated_at comes back from RETURNING
+    event.current_version += 1
     db.add(event)
+    db.flush()
     
     # Create a new version with the rolled back data
     new_version = create_version(
         db, 
         event, 
         user_id, 
-        f"Rollback to version {version_number}"
+        f"Rollback to version {version_number}",
+        previous_data=current_data
     )
     
-    # Create a changelog entry
-    changes = generate_diff(current_version.data, version.data)
+    # Create a changelog entry against the version just written, so entries compose
+    changes = generate_diff(current_data, event_to_dict(event))
     create_changelog(
         db,
-        event_id,
+        event.id,
         user_id,
         'rollback',
-        current_version.version_number,
+        current_version,
         new_version.version_number,
         changes
     )
     
+    occurrence_service.refresh_occurrences(db, event)
+    permission_service.sync_visibility(db, event)
     db.commit()
-    db.refresh(event)
+    event_service.invalidate_free_busy(event.owner_id)
     
-    return event
\ No newline at end of file
+    return event
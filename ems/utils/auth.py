@@ -1,17 +1,26 @@
 # app/core/security.py
+import time
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Any, Optional, Union
 
-from jose import jwt
-from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 
 from ems.core.config import settings
-from ems.models.token_model import TokenBlacklist
+from ems.schemas.token_schema import TokenPayload
+from ems.utils.cache import TTLCache
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    # passlib and its bcrypt backend load on the first hash or check, not at startup
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# Access tokens whose signature and claims already checked out, by digest, until they expire
+_verified_tokens: TTLCache[TokenPayload] = TTLCache(settings.VERIFIED_TOKEN_CACHE_SIZE, float("inf"))
 
 def create_access_token(subject: Union[str, Any], expires_delta: Optional[timedelta] = None) -> str:
+    from jose import jwt
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
@@ -23,6 +32,7 @@ def create_access_token(subject: Union[str, Any], expires_delta: Optional[timede
     return encoded_jwt
 
 def create_refresh_token(subject: Union[str, Any], expires_delta: Optional[timedelta] = None) -> str:
+    from jose import jwt
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
@@ -34,11 +44,28 @@ def create_refresh_token(subject: Union[str, Any], expires_delta: Optional[timed
     return encoded_jwt
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def is_token_blacklisted(db: Session, token: str) -> bool:
-    token_in_db = db.query(TokenBlacklist).filter(TokenBlacklist.token == token).first()
-    return token_in_db is not None
\ No newline at end of file
+    # Usually answered in memory; see TokenBlacklistCache
+    from ems.utils.token_blacklist import blacklist
+    return blacklist.is_blacklisted(db, token)
+
+def get_verified_token(token: str) -> Optional[TokenPayload]:
+    """The payload of an access token verified earlier in this process, if it hasn't expired."""
+    from ems.utils.token_blacklist import token_digest
+    return _verified_tokens.get(token_digest(token))
+
+def remember_verified_token(token: str, payload: TokenPayload, expires_at: float) -> None:
+    """Skip verifying the token again until `expires_at` (a Unix timestamp)."""
+    from ems.utils.token_blacklist import token_digest
+    ttl = expires_at - time.time()
+    if ttl > 0:
+        _verified_tokens.set(token_digest(token), payload, ttl=ttl)
+
+def forget_verified_token(token: str) -> None:
+    from ems.utils.token_blacklist import token_digest
+    _verified_tokens.invalidate(token_digest(token))
@@ -12,4 +12,22 @@ def permission_to_dict(permission, username=None):
         "can_share": permission.can_share,
         "granted_at": permission.granted_at,
         "username": username or "Unknown"
-    }
\ No newline at end of file
+    }
+
+def event_etag(version):
+    """ETag of an event representation, derived from its current_version"""
+    return f'"{version}"'
+
+def parse_if_match(header):
+    """
+    Versions listed in an If-Match header, or None for "*" (any version).
+    Weak and unparseable tags never match.
+    """
+    if header.strip() == "*":
+        return None
+    versions = set()
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith('"') and tag.endswith('"') and tag[1:-1].isdigit():
+            versions.add(int(tag[1:-1]))
+    return versions
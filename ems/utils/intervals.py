@@ -0,0 +1,117 @@
+# app/utils/intervals.py
+from bisect import bisect_left
+from datetime import datetime, time, timedelta, tzinfo
+from typing import Any, Callable, Collection, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+Span = Tuple[datetime, datetime]
+
+def merge_intervals(intervals: Sequence[Span]) -> List[Span]:
+    """Merge (start, end) intervals into a sorted list of disjoint ones."""
+    merged: List[Span] = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+def clip_intervals(intervals: Sequence[Span], start: datetime, end: datetime) -> List[Span]:
+    """Cut sorted, disjoint (start, end) intervals down to the part inside [start, end)."""
+    return [
+        (max(span_start, start), min(span_end, end))
+        for span_start, span_end in intervals
+        if span_start < end and span_end > start
+    ]
+
+def sweep_overlaps(new_intervals: Sequence[Span], existing: Sequence[Tuple[Any, datetime, datetime]]) -> List[Any]:
+    """
+    Return the keys of existing (key, start, end) intervals that overlap any of
+    the new (start, end) intervals, in one pass over both lists.
+
+    Both lists must be sorted by start, and the ends of the new intervals must
+    be sorted as well (true for one series, or for merge_intervals output).
+    """
+    overlapping = []
+    i = 0
+    for key, existing_start, existing_end in existing:
+        # New intervals ending before this one starts can't overlap anything later
+        while i < len(new_intervals) and new_intervals[i][1] <= existing_start:
+            i += 1
+        if i == len(new_intervals):
+            break
+        if new_intervals[i][0] < existing_end:
+            overlapping.append(key)
+    return overlapping
+
+def find_internal_overlaps(intervals: Sequence[Tuple[Any, datetime, datetime]]) -> List[Tuple[Any, Any]]:
+    """
+    Return (key, key) pairs of (key, start, end) intervals that overlap each
+    other. Sorting dominates, so this is O(n log n); each overlapping interval
+    is paired with the one that reaches furthest before it.
+    """
+    overlaps = []
+    furthest = None
+    for key, start, end in sorted(intervals, key=lambda interval: (interval[1], interval[2])):
+        if furthest is not None and start < furthest[2]:
+            if key != furthest[0]:
+                overlaps.append((furthest[0], key))
+        if furthest is None or end > furthest[2]:
+            furthest = (key, start, end)
+    return overlaps
+
+def working_windows(start: datetime, end: datetime, day_start: time, day_end: time,
+                    weekdays: Collection[int], tz: tzinfo, step: timedelta) -> Iterator[Span]:
+    """
+    Yield the [day_start, day_end) working hours of each weekday (0-6 for
+    Monday-Sunday) in the given time zone, cut down to [start, end).
+    A window cut short by `start` begins on the next multiple of `step`
+    from day_start, so slots keep to the same grid every day.
+    """
+    day = start.astimezone(tz).date()
+    last_day = end.astimezone(tz).date()
+    while day <= last_day:
+        if day.weekday() in weekdays:
+            window_start = datetime.combine(day, day_start, tz)
+            window_end = min(datetime.combine(day, day_end, tz), end)
+            if window_start < start:
+                window_start += -(-(start - window_start) // step) * step
+            if window_start < window_end:
+                yield window_start, window_end
+        day += timedelta(days=1)
+
+def overlap_end(intervals: Sequence[Span], start: datetime, end: datetime) -> Optional[datetime]:
+    """
+    End of the last of the sorted, disjoint intervals that overlaps
+    [start, end), or None if none does. A binary search, no scan.
+    """
+    index = bisect_left(intervals, (end,)) - 1
+    if index >= 0 and intervals[index][1] > start:
+        return intervals[index][1]
+    return None
+
+def find_free_slots(windows: Iterable[Span], duration: timedelta, step: timedelta, count: int,
+                    busy_until: Callable[[datetime, datetime], Optional[datetime]]) -> List[Span]:
+    """
+    Return up to `count` (start, end) slots of `duration` inside the sorted
+    windows, earliest first. Slots start on multiples of `step` from the
+    start of their window.
+
+    busy_until(start, end) returns None if [start, end) is free, otherwise
+    when something in the way ends; the sweep then jumps straight past it
+    rather than trying every step in between.
+    """
+    slots: List[Span] = []
+    for window_start, window_end in windows:
+        slot_start = window_start
+        while slot_start + duration <= window_end:
+            slot_end = slot_start + duration
+            blocked_until = busy_until(slot_start, slot_end)
+            if blocked_until:
+                slot_start = window_start + -(-(blocked_until - window_start) // step) * step
+                continue
+            slots.append((slot_start, slot_end))
+            if len(slots) == count:
+                return slots
+            slot_start += step
+    return slots
@@ -0,0 +1,32 @@
+# app/utils/pagination.py
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+Cursor = Tuple[datetime, uuid.UUID]
+
+def encode_cursor(sort_value: datetime, row_id: uuid.UUID) -> str:
+    """Encode a (timestamp, id) keyset position as an opaque URL-safe string."""
+    raw = json.dumps([sort_value.isoformat(), str(row_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Cursor:
+    """Decode a cursor produced by encode_cursor. Raises ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, row_id = json.loads(raw)
+        return datetime.fromisoformat(sort_value), uuid.UUID(row_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+def paginate(rows: Sequence[Any], limit: int, key: Callable[[Any], Cursor]) -> Tuple[List[Any], Optional[str]]:
+    """
+    Split a result fetched with `limit + 1` rows into the page and the cursor
+    for the next one (None on the last page).
+    """
+    items = list(rows[:limit])
+    if len(rows) <= limit:
+        return items, None
+    return items, encode_cursor(*key(items[-1]))
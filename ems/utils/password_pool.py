@@ -0,0 +1,79 @@
+# app/utils/password_pool.py
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from ems.core.config import settings
+from ems.utils.auth import get_password_hash, verify_password
+
+T = TypeVar("T")
+
+# Checked when the login names no user, so that takes as long as a wrong password
+DUMMY_HASH = "$2b$12$AO6vb00pDLL/ZuJBozSCkuXtDhpwigM5skIb.xbPA0kDhm1PBTFee"
+
+
+class PasswordPoolBusy(Exception):
+    """Raised instead of queueing once PASSWORD_POOL_MAX_PENDING calls are waiting."""
+
+
+class PasswordPool:
+    """
+    Runs bcrypt in a small pool of worker processes, so hashing never blocks
+    the event loop or competes for the GIL with the rest of the API.
+
+    At most `max_pending` calls may be queued or running at once; beyond
+    that they fail fast with PasswordPoolBusy, so a burst of logins is shed
+    instead of piling up behind the pool. With no workers, bcrypt runs in
+    the default threadpool, still bounded the same way.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+
+    def _get_executor(self) -> Optional[Executor]:
+        if not self.workers:
+            return None
+        with self._lock:
+            if self._executor is None:
+                # Forking a process that runs an event loop and DB pools isn't safe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    async def _run(self, fn: Callable[..., T], *args: Any) -> T:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise PasswordPoolBusy()
+            self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def verify(self, plain_password: str, hashed_password: Optional[str]) -> bool:
+        """Check a password; a missing hash is checked against DUMMY_HASH and fails."""
+        valid = await self._run(verify_password, plain_password, hashed_password or DUMMY_HASH)
+        return valid and hashed_password is not None
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    def metrics(self) -> Dict[str, int]:
+        return {"workers": self.workers, "pending": self._pending, "max_pending": self.max_pending}
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+password_pool = PasswordPool(settings.PASSWORD_POOL_WORKERS, settings.PASSWORD_POOL_MAX_PENDING)
@@ -1,19 +1,187 @@
 # app/utils/rate_limit.py
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-from fastapi import Request
-from fastapi.responses import JSONResponse 
-
-limiter = Limiter(key_func=get_remote_address)
-
-# Custom rate limit handler
-def rate_limit_handler(request: Request, exc: RateLimitExceeded):
-    response = JSONResponse(
-        status_code=429,
-        content={"detail": f"Rate limit exceeded: {exc.detail}"}
-    )
-    response = request.app.state.limiter._inject_headers(
-        response, request.state.view_rate_limit
-    )
-    return response
\ No newline at end of file
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, NamedTuple, Optional, Protocol, Tuple
+
+from fastapi import HTTPException, Request, Response, status
+
+from ems.core.config import settings
+
+
+class Bucket(NamedTuple):
+    allowed: bool
+    remaining: float  # Tokens left after this request was (or wasn't) charged
+
+
+class RateLimitStorage(Protocol):
+    async def take(self, key: str, capacity: int, rate: float, cost: int) -> Bucket:
+        """Refill the bucket at `rate` tokens per second up to `capacity`, then take `cost` if there are enough."""
+        ...
+
+
+class MemoryStorage:
+    """
+    Buckets held in this process. Each worker enforces its own limits, so
+    with N workers a client can get up to N times the configured rate.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()  # key -> (tokens, updated)
+
+    async def take(self, key: str, capacity: int, rate: float, cost: int) -> Bucket:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            # Buckets dropped here were idle longest; they come back full
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return Bucket(allowed, tokens)
+
+
+# Refill and take in one atomic step, on the server's clock so workers agree
+_TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisStorage:
+    """
+    Buckets in Redis, or any store that speaks its protocol and runs Lua,
+    shared by every worker. `client` only needs an async
+    eval(script, numkeys, *keys_and_args), so a local fake can stand in.
+    """
+
+    def __init__(self, client: Any, prefix: str = "ratelimit:"):
+        self._client = client
+        self._prefix = prefix
+
+    async def take(self, key: str, capacity: int, rate: float, cost: int) -> Bucket:
+        allowed, remaining = await self._client.eval(_TAKE_SCRIPT, 1, self._prefix + key, capacity, rate, cost)
+        return Bucket(bool(int(allowed)), float(remaining))
+
+
+_storage: Optional[RateLimitStorage] = None
+
+def get_storage() -> RateLimitStorage:
+    """The storage named by RATE_LIMIT_STORAGE_URL, created on first use."""
+    global _storage
+    if _storage is None:
+        url = settings.RATE_LIMIT_STORAGE_URL
+        if url.startswith(("redis://", "rediss://", "unix://")):
+            # Only needed when limits are shared between workers
+            from redis.asyncio import from_url
+            _storage = RedisStorage(from_url(url))
+        elif url == "memory://":
+            _storage = MemoryStorage(settings.RATE_LIMIT_MEMORY_KEYS)
+        else:
+            raise ValueError(f"Unsupported RATE_LIMIT_STORAGE_URL {url}")
+    return _storage
+
+def set_storage(storage: Optional[RateLimitStorage]) -> None:
+    """Replace the storage, e.g. with a fake Redis; None goes back to the configured one."""
+    global _storage
+    _storage = storage
+
+
+def cost(weigh: Callable[[Any], int]):
+    """
+    Make each call of a route cost weigh(json_body) requests instead of one,
+    for routes whose work grows with the payload. Goes under @router.<method>.
+    """
+    def decorate(endpoint):
+        endpoint.rate_limit_cost = weigh
+        return endpoint
+    return decorate
+
+def _client_key(request: Request) -> str:
+    """The user a valid access token belongs to, otherwise the client's address."""
+    from ems.schemas.token_schema import TokenPayload
+    from ems.utils.auth import get_verified_token, remember_verified_token
+
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        payload = get_verified_token(token)
+        if payload is None:
+            from jose import jwt
+            try:
+                claims = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
+            except jwt.JWTError:
+                claims = {}
+            if claims.get("type") == "access" and claims.get("sub"):
+                payload = TokenPayload(**claims)
+                if claims.get("exp"):
+                    remember_verified_token(token, payload, claims["exp"])
+        if payload is not None and payload.sub:
+            return f"user:{payload.sub}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+async def _request_cost(request: Request, weigh: Optional[Callable[[Any], int]]) -> int:
+    if weigh is None:
+        return 1
+    try:
+        # FastAPI has already read and parsed the body; this is its cached copy
+        return max(1, int(weigh(await request.json())))
+    except Exception:
+        # Malformed bodies are rejected by validation; charge them as one request
+        return 1
+
+async def rate_limit(request: Request, response: Response) -> None:
+    """
+    Dependency charging the caller's token bucket for the matched route.
+    Each user (or address, before logging in) gets a bucket per route of
+    RATE_LIMIT_BURST tokens refilled at RATE_LIMIT_PER_MINUTE. A request
+    costs one token unless its route is weighted with @cost; no request
+    costs more than a full bucket. Sets the RateLimit-* headers, and answers
+    429 with Retry-After when the bucket is short.
+    """
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+
+    route = request.scope.get("route")
+    capacity = settings.RATE_LIMIT_BURST
+    rate = settings.RATE_LIMIT_PER_MINUTE / 60
+    request_cost = min(capacity, await _request_cost(request, getattr(route.endpoint, "rate_limit_cost", None)))
+    bucket = await get_storage().take(f"{_client_key(request)}:{route.name}", capacity, rate, request_cost)
+
+    remaining = math.floor(bucket.remaining)
+    headers = {
+        "RateLimit-Limit": str(capacity),
+        "RateLimit-Remaining": str(remaining),
+        # Seconds until the bucket is full again
+        "RateLimit-Reset": str(math.ceil((capacity - bucket.remaining) / rate)),
+        "RateLimit-Policy": f"{capacity};w={math.ceil(capacity / rate)}",
+    }
+    if not bucket.allowed:
+        headers["Retry-After"] = str(math.ceil((request_cost - bucket.remaining) / rate))
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded, try again later",
+            headers=headers,
+        )
+    response.headers.update(headers)
@@ -0,0 +1,204 @@
+# app/utils/recurrence.py
+import calendar
+from datetime import MAXYEAR, datetime, timedelta
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from pydantic import ValidationError
+
+from ems.schemas.event_schema import RecurrencePatternBase
+
+# The Gregorian calendar repeats every 4800 months, so a monthly or yearly
+# rule that skipped this many periods in a row never matches again
+_MAX_EMPTY_PERIODS = 4800
+
+# How far before its end_date a series' last occurrence is looked for, per
+# interval; a rule that can match skips at most 7 periods in a row (Feb 29)
+_LAST_OCCURRENCE_LOOKBACK = {
+    'weekly': timedelta(weeks=2),
+    'monthly': timedelta(days=8 * 31),
+    'yearly': timedelta(days=8 * 366),
+}
+
+
+def _align_tz(value: datetime, reference: datetime) -> datetime:
+    """Give naive datetimes the reference's tzinfo so they can be compared."""
+    if value.tzinfo is None and reference.tzinfo is not None:
+        return value.replace(tzinfo=reference.tzinfo)
+    if value.tzinfo is not None and reference.tzinfo is None:
+        return value.replace(tzinfo=None)
+    return value
+
+def parse_pattern(pattern: Optional[Dict[str, Any]]) -> Optional[RecurrencePatternBase]:
+    """Validate a stored recurrence_pattern, returning None if it cannot be used."""
+    if not pattern:
+        return None
+    try:
+        return RecurrencePatternBase.model_validate(pattern)
+    except ValidationError:
+        return None
+
+def _candidate_starts(start_time: datetime, rule: RecurrencePatternBase,
+                      window_start: Optional[datetime]) -> Iterator[datetime]:
+    """
+    Yield the series' start times after the first one, in order, stopping at
+    the end of the calendar or once a monthly or yearly rule can no longer
+    match. When the rule has no count, the series jumps straight to the
+    window instead of walking every earlier instance.
+    """
+    interval = max(rule.interval, 1)
+    skip_ahead = rule.count is None and window_start is not None and window_start > start_time
+
+    if rule.frequency == 'daily':
+        step = timedelta(days=interval)
+        n = 1
+        if skip_ahead:
+            n = max(1, (window_start - start_time) // step)
+        while True:
+            try:
+                candidate = start_time + n * step
+            except OverflowError:
+                return
+            yield candidate
+            n += 1
+
+    elif rule.frequency == 'weekly':
+        weekdays = sorted(set(rule.days_of_week or [start_time.weekday()]))
+        week_start = start_time - timedelta(days=start_time.weekday())
+        step = timedelta(weeks=interval)
+        n = 0
+        if skip_ahead:
+            n = max(0, (window_start - week_start) // step - 1)
+        while True:
+            try:
+                candidates = [week_start + n * step + timedelta(days=weekday) for weekday in weekdays]
+            except OverflowError:
+                return
+            for candidate in candidates:
+                if candidate > start_time:
+                    yield candidate
+            n += 1
+
+    elif rule.frequency == 'monthly':
+        day = rule.day_of_month or start_time.day
+        n, misses = 1, 0
+        if skip_ahead:
+            months = (window_start.year - start_time.year) * 12 + window_start.month - start_time.month
+            n = max(1, months // interval)
+        while misses < _MAX_EMPTY_PERIODS:
+            month_index = start_time.month - 1 + n * interval
+            year, month = start_time.year + month_index // 12, month_index % 12 + 1
+            if year > MAXYEAR:
+                return
+            # Months that don't have the requested day are skipped
+            if day <= calendar.monthrange(year, month)[1]:
+                misses = 0
+                yield start_time.replace(year=year, month=month, day=day)
+            else:
+                misses += 1
+            n += 1
+
+    elif rule.frequency == 'yearly':
+        month = rule.month_of_year or start_time.month
+        day = rule.day_of_month or start_time.day
+        n = 1 if month == start_time.month and day == start_time.day else 0
+        if skip_ahead:
+            n = max(n, (window_start.year - start_time.year) // interval)
+        misses = 0
+        while misses < _MAX_EMPTY_PERIODS:
+            year = start_time.year + n * interval
+            if year > MAXYEAR:
+                return
+            if day <= calendar.monthrange(year, month)[1]:
+                misses = 0
+                candidate = start_time.replace(year=year, month=month, day=day)
+                if candidate > start_time:
+                    yield candidate
+            else:
+                misses += 1
+            n += 1
+
+def iter_occurrences(start_time: datetime, end_time: datetime, pattern: Optional[Dict[str, Any]],
+                     window_start: Optional[datetime] = None,
+                     window_end: Optional[datetime] = None) -> Iterator[Tuple[datetime, datetime]]:
+    """
+    Lazily yield (start, end) for each occurrence of an event that overlaps
+    [window_start, window_end). The first occurrence is the event itself.
+
+    Either the window end or the pattern's end_date/count must bound the
+    series, otherwise the generator is infinite.
+    """
+    duration = end_time - start_time
+    if window_start is not None:
+        window_start = _align_tz(window_start, start_time)
+    if window_end is not None:
+        window_end = _align_tz(window_end, start_time)
+
+    def in_window(occ_start: datetime) -> bool:
+        if window_start is not None and occ_start + duration <= window_start:
+            return False
+        return True
+
+    if window_end is None or start_time < window_end:
+        if in_window(start_time):
+            yield start_time, end_time
+
+    rule = parse_pattern(pattern)
+    if rule is None:
+        return
+
+    until = _align_tz(rule.end_date, start_time) if rule.end_date else None
+    # The window can't skip over instances that still count towards `count`
+    lookback = window_start - duration if window_start is not None else None
+
+    emitted = 1
+    for occ_start in _candidate_starts(start_time, rule, lookback):
+        if rule.count is not None and emitted >= rule.count:
+            return
+        if until is not None and occ_start > until:
+            return
+        if window_end is not None and occ_start >= window_end:
+            return
+        emitted += 1
+        if in_window(occ_start):
+            yield occ_start, occ_start + duration
+
+def series_end(start_time: datetime, end_time: datetime, pattern: Optional[Dict[str, Any]]) -> Optional[datetime]:
+    """
+    End of the last occurrence of an event, or None for a series that never
+    ends or ends past what datetime can hold. Pass pattern=None for events
+    that don't recur.
+    """
+    rule = parse_pattern(pattern)
+    if rule is None:
+        return end_time
+    if rule.count is None and rule.end_date is None:
+        return None
+    until = _align_tz(rule.end_date, start_time) if rule.end_date else None
+
+    if rule.frequency == 'daily':
+        # Occurrences are a fixed step apart, so the last one is computed directly
+        step = timedelta(days=rule.interval)
+        last = rule.count - 1 if rule.count is not None else None
+        if until is not None:
+            last_by_date = max(0, (until - start_time) // step)
+            last = last_by_date if last is None else min(last, last_by_date)
+        try:
+            return end_time + last * step
+        except OverflowError:
+            return None
+
+    last_end = None
+    if rule.count is None:
+        # Only end_date bounds the series; expand just the periods before it
+        try:
+            window_start = until - _LAST_OCCURRENCE_LOOKBACK[rule.frequency] * rule.interval
+        except OverflowError:
+            window_start = None
+        for _, last_end in iter_occurrences(start_time, end_time, pattern, window_start=window_start):
+            pass
+    if last_end is None:
+        # At most MAX_OCCURRENCES when counted
+        last_end = end_time
+        for _, last_end in iter_occurrences(start_time, end_time, pattern):
+            pass
+    return last_end
@@ -0,0 +1,154 @@
+# app/utils/token_blacklist.py
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from ems.core.config import settings
+from ems.models.token_model import TokenBlacklist
+
+
+def token_digest(token: str) -> str:
+    """Blacklist rows are keyed by this digest rather than the full JWT."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over hex digests; no false negatives."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, digest: str):
+        # Double hashing over two halves of the digest (Kirsch-Mitzenmacher)
+        h1, h2 = int(digest[:16], 16), int(digest[16:32], 16) | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, digest: str) -> None:
+        for position in self._positions(digest):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, digest: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(digest))
+
+
+class TokenBlacklistCache:
+    """
+    In-process front for the token_blacklist table.
+
+    A Bloom filter holds every unexpired blacklisted digest, so a token that
+    was never blacklisted is answered from memory. Bloom hits are confirmed
+    through an LRU of recent answers and only then through the database.
+    The filter is topped up from the table every BLACKLIST_SYNC_SECONDS to
+    pick up logouts handled by other workers, and rebuilt when expired rows
+    are purged.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bloom = BloomFilter(settings.BLACKLIST_BLOOM_CAPACITY, settings.BLACKLIST_BLOOM_ERROR_RATE)
+        self._lru: "OrderedDict[str, Optional[datetime]]" = OrderedDict()  # digest -> expires_at, None if not blacklisted
+        self._synced_at: Optional[float] = None
+        self._watermark: Optional[datetime] = None
+        self._purged_at = 0.0
+
+    def _needs_sync(self) -> bool:
+        return self._synced_at is None or time.monotonic() - self._synced_at >= settings.BLACKLIST_SYNC_SECONDS
+
+    def _remember(self, digest: str, expires_at: Optional[datetime]) -> None:
+        self._lru[digest] = expires_at
+        self._lru.move_to_end(digest)
+        while len(self._lru) > settings.BLACKLIST_LRU_SIZE:
+            self._lru.popitem(last=False)
+
+    def lookup(self, token: str) -> Optional[bool]:
+        """Answer from memory only; None means the database has to be asked."""
+        if self._needs_sync():
+            return None
+        digest = token_digest(token)
+        with self._lock:
+            if digest not in self._bloom:
+                return False
+            if digest in self._lru:
+                expires_at = self._lru[digest]
+                self._lru.move_to_end(digest)
+                return expires_at is not None and expires_at > datetime.now(timezone.utc)
+        return None
+
+    def sync(self, db: Session) -> None:
+        """Purge expired rows if due, then load rows added since the last sync into the filter."""
+        now = time.monotonic()
+        if now - self._purged_at >= settings.BLACKLIST_PURGE_SECONDS:
+            self.purge_expired(db)
+            return
+
+        query = db.query(TokenBlacklist.token_hash, TokenBlacklist.blacklisted_on).filter(
+            TokenBlacklist.expires_at > datetime.now(timezone.utc)
+        )
+        if self._watermark is not None:
+            # Overlap a little in case a slow transaction committed an older timestamp
+            query = query.filter(TokenBlacklist.blacklisted_on >= self._watermark - timedelta(minutes=1))
+        rows = query.all()
+        with self._lock:
+            for row in rows:
+                self._bloom.add(row.token_hash)
+                # Drop a cached "not blacklisted" answer that another worker has made stale
+                if row.token_hash in self._lru and self._lru[row.token_hash] is None:
+                    del self._lru[row.token_hash]
+                if self._watermark is None or row.blacklisted_on > self._watermark:
+                    self._watermark = row.blacklisted_on
+            self._synced_at = now
+
+    def purge_expired(self, db: Session) -> None:
+        """Delete expired rows and rebuild the filter from what is left."""
+        db.execute(delete(TokenBlacklist).where(TokenBlacklist.expires_at <= datetime.now(timezone.utc)))
+        db.commit()
+        with self._lock:
+            self._bloom = BloomFilter(settings.BLACKLIST_BLOOM_CAPACITY, settings.BLACKLIST_BLOOM_ERROR_RATE)
+            self._lru.clear()
+            self._watermark = None
+            self._synced_at = None
+            self._purged_at = time.monotonic()
+        self.sync(db)
+
+    def is_blacklisted(self, db: Session, token: str) -> bool:
+        answer = self.lookup(token)
+        if answer is not None:
+            return answer
+        if self._needs_sync():
+            self.sync(db)
+            answer = self.lookup(token)
+            if answer is not None:
+                return answer
+
+        digest = token_digest(token)
+        row = db.query(TokenBlacklist.expires_at).filter(TokenBlacklist.token_hash == digest).first()
+        expires_at = row.expires_at if row else None
+        with self._lock:
+            self._remember(digest, expires_at)
+        return expires_at is not None and expires_at > datetime.now(timezone.utc)
+
+    def add(self, db: Session, token: str, expires_at: datetime) -> None:
+        digest = token_digest(token)
+        # Logging out twice with the same token is not an error
+        db.execute(
+            insert(TokenBlacklist)
+            .values(token_hash=digest, expires_at=expires_at)
+            .on_conflict_do_nothing(index_elements=[TokenBlacklist.token_hash])
+        )
+        db.commit()
+        with self._lock:
+            self._bloom.add(digest)
+            self._remember(digest, expires_at)
+
+
+blacklist = TokenBlacklistCache()
@@ -1,26 +1,31 @@
 # app/main.py
-from fastapi import FastAPI
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
 
 from ems.api.v1 import auth_router, events_router, permissions_router, versions_router
 from ems.core.config import settings
-from ems.db.session import engine
-from ems.db.base import Base 
-from ems.utils.rate_limit import limiter, rate_limit_handler
-from sqlalchemy import text
+from ems.db.session import dispose_engines, get_pool_metrics
+from ems.utils.password_pool import password_pool
+from ems.utils.rate_limit import rate_limit
+from ems.utils.responses import ORJSONResponse
+
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Nothing to set up: the schema comes from `alembic upgrade head`, and the
+    # engine and bcrypt workers start on first use, so a new worker serves at once
+    yield
+    password_pool.shutdown()
+    await dispose_engines()
 
-Base.metadata.create_all(bind=engine)
 app = FastAPI(
     title=settings.SERVER_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, rate_limit_handler)
 
 # Set all CORS enabled origins
 if settings.BACKEND_CORS_ORIGINS:
@@ -32,18 +37,21 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_headers=["*"],
     )
 
-# Include routers
-app.include_router(auth_router.router, prefix=f"{settings.API_V1_STR}/auth", tags=["auth"])
-app.include_router(events_router.router, prefix=f"{settings.API_V1_STR}/events", tags=["events"])
+# Include routers; every API route is rate limited per user and route
+limited = [Depends(rate_limit)]
+app.include_router(auth_router.router, prefix=f"{settings.API_V1_STR}/auth", tags=["auth"], dependencies=limited)
+app.include_router(events_router.router, prefix=f"{settings.API_V1_STR}/events", tags=["events"], dependencies=limited)
 app.include_router(
     permissions_router.router, 
     prefix=f"{settings.API_V1_STR}/events", 
-    tags=["permissions"]
+    tags=["permissions"],
+    dependencies=limited
 )
 app.include_router(
     versions_router.router, 
     prefix=f"{settings.API_V1_STR}/events", 
-    tags=["versions"]
+    tags=["versions"],
+    dependencies=limited
 )
 @app.get("/")
 def read_root():
@@ -51,4 +59,8 @@ def read_root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+@app.get("/metrics")
+def metrics():
+    return {"db_pool": get_pool_metrics(), "password_pool": password_pool.metrics()}